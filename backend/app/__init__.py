@@ -1,7 +1,7 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
-from elasticsearch import Elasticsearch
 from elasticsearch.exceptions import ConnectionError
+from app.utils.es_client import get_es, pool_stats, seed_hosts
 import os
 import sys
 
@@ -51,9 +51,9 @@ def create_app():
     app.register_blueprint(chatbot_bp)
     app.register_blueprint(admin_bp)
     
-    # Initialize Elasticsearch client
-    es_host = os.getenv('ELASTICSEARCH_HOST', 'http://127.0.0.1:9200')
-    es = Elasticsearch([es_host])
+    # Shared Elasticsearch client, configured from the environment
+    es_host = ', '.join(seed_hosts())
+    es = get_es()
     
     # Check Elasticsearch connection
     try:
@@ -76,6 +76,10 @@ def create_app():
     from app.models.user import User
     Resource.setup_index()
     User.setup_index()
+
+    # Store the compiled search template so routes only send params
+    from app.utils.query_compiler import SearchQuery
+    SearchQuery.register_templates(es)
     
     @app.route('/health')
     def health_check():
@@ -86,9 +90,21 @@ def create_app():
         except:
             pass
         
+        from app.utils.cache import search_cache, count_cache, suggest_cache, user_cache
+        from app.utils.singleflight import search_flight
+        from app.utils.bulk_writer import bulk_writer
+        from app.utils.password_pool import password_pool
         return {
             'status': 'healthy',
-            'elasticsearch': es_health
+            'elasticsearch': es_health,
+            'elasticsearch_pool': pool_stats(),
+            'search_cache': search_cache.stats(),
+            'count_cache': count_cache.stats(),
+            'suggest_cache': suggest_cache.stats(),
+            'user_cache': user_cache.stats(),
+            'search_singleflight': search_flight.stats(),
+            'bulk_writer': bulk_writer.stats(),
+            'password_pool': password_pool.stats()
         }
     
     return app 
\ No newline at end of file
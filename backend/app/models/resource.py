@@ -1,17 +1,58 @@
 from datetime import datetime
-from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk
+from elasticsearch.helpers import bulk, streaming_bulk, parallel_bulk
 from elasticsearch.exceptions import NotFoundError
 from urllib.parse import urlparse
+import os
 import re
+from app.utils.es_client import get_es
+from app.utils.query_compiler import SearchQuery, hits_to_resources, execute_batch
+from app.utils.cache import invalidate_resource_caches, suggest_cache
+from app.utils.bulk_writer import bulk_writer, BulkItemError
+from app.utils.routing import ROUTE_BY_TYPE, ROUTING_SEPARATOR, new_resource_id, routing_for_id, type_routing, routed_params
 
-es = Elasticsearch(['http://127.0.0.1:9200'])
+es = get_es()
+
+# Typeahead over titles and tags, with a status context so only approved
+# resources are suggested
+SUGGEST_MAPPING = {
+    'type': 'completion',
+    'contexts': [{'name': 'status', 'type': 'category', 'path': 'status'}]
+}
+
+KEYWORD_SUBFIELD = {'type': 'keyword', 'ignore_above': 256}
+
+# Primary shards for new versioned indices; routing by type only narrows
+# searches when there is more than one
+INDEX_SHARDS = int(os.getenv('RESOURCE_INDEX_SHARDS', 1))
+
+# Merges the partial doc and rebuilds the typeahead input from the stored
+# title and tags, so updates need no read first
+UPDATE_SCRIPT = """
+ctx._source.putAll(params.doc);
+List inputs = new ArrayList();
+if (ctx._source.title != null) { inputs.add(ctx._source.title); }
+if (ctx._source.tags != null) { inputs.addAll(ctx._source.tags); }
+ctx._source.suggest = ['input': inputs];
+"""
+
+# Moderation only applies to resources still pending, checked on the server
+MODERATE_SCRIPT = """
+if (ctx._source.status != 'pending') { ctx.op = 'noop'; }
+else { ctx._source.putAll(params.doc); }
+"""
 
 class ResourceValidationError(Exception):
     pass
 
+class ResourceConflictError(ResourceValidationError):
+    """A conditional write lost to a concurrent change"""
+    pass
+
 class Resource:
+    # index_name is an alias over ai_resources_v{MAPPING_VERSION}
     index_name = 'ai_resources'
+    MAPPING_VERSION = 2
+    es = es
     
     RESOURCE_TYPES = [
         'Tutorial',
@@ -88,25 +129,14 @@ class Resource:
         }
 
     @classmethod
-    def create(cls, resource_data):
-        """Create a new resource"""
+    def create(cls, resource_data, consistent=False):
+        """Create a new resource; consistent=True waits until it is searchable"""
         try:
-            # Validate required fields
-            required_fields = ['title', 'url', 'description', 'category', 'resource_type']
-            missing_fields = [field for field in required_fields if not resource_data.get(field)]
-            if missing_fields:
-                raise ResourceValidationError(f"Missing required fields: {', '.join(missing_fields)}")
-
-            # Validate resource type
-            if resource_data['resource_type'] not in cls.RESOURCE_TYPES:
-                raise ResourceValidationError(f"Invalid resource type. Must be one of: {', '.join(cls.RESOURCE_TYPES)}")
-
-            # Create resource instance
-            resource = cls(**resource_data)
+            resource, body = cls.build(resource_data)
 
             # Save to Elasticsearch
-            result = es.index(index=cls.index_name, body=resource.to_dict())
-            es.indices.refresh(index=cls.index_name)
+            result = bulk_writer.write({'index': cls.placement(resource.resource_type)}, body, consistent)
+            invalidate_resource_caches()
             
             return {'id': result['_id'], **resource.to_dict()}
         except ResourceValidationError as e:
@@ -114,109 +144,192 @@ class Resource:
         except Exception as e:
             raise ResourceValidationError(f"Failed to create resource: {str(e)}")
 
+    @classmethod
+    def build(cls, resource_data):
+        """Validate resource data and return the instance and its index body"""
+        # Validate required fields
+        required_fields = ['title', 'url', 'description', 'category', 'resource_type']
+        missing_fields = [field for field in required_fields if not resource_data.get(field)]
+        if missing_fields:
+            raise ResourceValidationError(f"Missing required fields: {', '.join(missing_fields)}")
+
+        # Validate resource type
+        if resource_data['resource_type'] not in cls.RESOURCE_TYPES:
+            raise ResourceValidationError(f"Invalid resource type. Must be one of: {', '.join(cls.RESOURCE_TYPES)}")
+
+        # Create resource instance
+        try:
+            resource = cls(**resource_data)
+        except TypeError as e:
+            raise ResourceValidationError(f"Invalid resource fields: {str(e)}")
+
+        body = {**resource.to_dict(), 'suggest': cls.suggest_input(resource.title, resource.tags)}
+        return resource, body
+
+    @classmethod
+    def placement(cls, resource_type, resource_id=None):
+        """Index, id and routing metadata for a new resource
+
+        resource_id fixes the id (prefixed with the routing key when routing
+        by type); without it Elasticsearch or new_resource_id picks one.
+        """
+        if not ROUTE_BY_TYPE:
+            metadata = {'_index': cls.index_name}
+            if resource_id:
+                metadata['_id'] = resource_id
+            return metadata
+        routing = type_routing(resource_type)
+        return {
+            '_index': cls.index_name,
+            '_id': f"{routing}{ROUTING_SEPARATOR}{resource_id}" if resource_id else new_resource_id(resource_type),
+            'routing': routing
+        }
+
     @classmethod
     def get(cls, resource_id):
         """Get a resource by ID"""
         try:
-            result = es.get(index=cls.index_name, id=resource_id)
-            return {'id': result['_id'], **result['_source']}
+            result = es.get(index=cls.index_name, id=resource_id, **routed_params(routing_for_id(resource_id)))
+            return {
+                'id': result['_id'],
+                **result['_source'],
+                'seq_no': result['_seq_no'],
+                'primary_term': result['_primary_term']
+            }
         except NotFoundError:
             return None
         except Exception as e:
             raise ResourceValidationError(f"Failed to get resource: {str(e)}")
 
     @classmethod
-    def update(cls, resource_id, resource_data):
-        """Update a resource"""
+    def update(cls, resource_id, resource_data, consistent=False, if_seq_no=None, if_primary_term=None):
+        """Update a resource in one round trip
+
+        Returns False when the resource does not exist. Passing the seq_no and
+        primary_term from a previous get makes the write conditional, raising
+        ResourceConflictError if the resource changed in between.
+        """
         try:
-            current = cls.get(resource_id)
-            if not current:
-                return False
+            routing = routing_for_id(resource_id)
+            if routing and resource_data.get('resource_type') and type_routing(resource_data['resource_type']) != routing:
+                # The type picks the shard, so moving it would strand the document
+                raise ResourceValidationError("resource_type cannot be changed once a resource is routed by type")
 
             # Update timestamp
             resource_data['updated_at'] = datetime.utcnow().isoformat()
-            
-            es.update(
-                index=cls.index_name,
-                id=resource_id,
-                body={'doc': resource_data}
-            )
-            es.indices.refresh(index=cls.index_name)
+
+            action = cls.conditional_action('update', resource_id, if_seq_no, if_primary_term)
+            if 'title' in resource_data or 'tags' in resource_data:
+                # Keep the typeahead input in step with title and tags
+                body = {'script': {'source': UPDATE_SCRIPT, 'params': {'doc': resource_data}}}
+            else:
+                body = {'doc': resource_data}
+            bulk_writer.write(action, body, consistent)
+            invalidate_resource_caches()
             return True
+        except BulkItemError as e:
+            return cls.write_failed(e, 'update')
+        except ResourceValidationError:
+            raise
         except Exception as e:
             raise ResourceValidationError(f"Failed to update resource: {str(e)}")
 
     @classmethod
-    def delete(cls, resource_id):
-        """Delete a resource"""
+    def delete(cls, resource_id, consistent=False, if_seq_no=None, if_primary_term=None):
+        """Delete a resource in one round trip; consistent=True waits until it is gone from search"""
         try:
-            if not cls.get(resource_id):
-                return False
-                
-            es.delete(index=cls.index_name, id=resource_id)
-            es.indices.refresh(index=cls.index_name)
+            action = cls.conditional_action('delete', resource_id, if_seq_no, if_primary_term)
+            bulk_writer.write(action, None, consistent)
+            invalidate_resource_caches()
             return True
+        except BulkItemError as e:
+            return cls.write_failed(e, 'delete')
         except Exception as e:
             raise ResourceValidationError(f"Failed to delete resource: {str(e)}")
 
     @classmethod
-    def search(cls, query=None, category=None, resource_type=None, tags=None, 
-              status=None, page=1, size=10):
-        """Search for resources with filters"""
+    def moderate(cls, resource_id, moderation_data):
+        """Apply an approve/reject update only if the resource is still pending
+
+        Returns 'updated', 'not_pending', or None when the resource does not
+        exist. The status check runs in the update script, so two admins
+        acting at once cannot both succeed.
+        """
         try:
-            must_conditions = []
-            
-            if query:
-                must_conditions.append({
-                    'multi_match': {
-                        'query': query,
-                        'fields': ['title^3', 'description^2', 'tags', 'author'],
-                        'type': 'best_fields',
-                        'fuzziness': 'AUTO'
-                    }
-                })
+            action = cls.conditional_action('update', resource_id)
+            # The script re-checks the status, so retrying a conflict is safe
+            action['update']['retry_on_conflict'] = 3
+            result = bulk_writer.write(
+                action,
+                {'script': {'source': MODERATE_SCRIPT, 'params': {'doc': moderation_data}}},
+                consistent=True
+            )
+            if result.get('result') == 'noop':
+                return 'not_pending'
+            invalidate_resource_caches()
+            return 'updated'
+        except BulkItemError as e:
+            # write_failed raises unless the resource was not found
+            cls.write_failed(e, 'moderate')
+            return None
+        except Exception as e:
+            raise ResourceValidationError(f"Failed to moderate resource: {str(e)}")
 
-            if category:
-                must_conditions.append({'term': {'category.keyword': category}})
-                
-            if resource_type:
-                must_conditions.append({'term': {'resource_type.keyword': resource_type}})
-                
-            if tags:
-                must_conditions.append({'terms': {'tags.keyword': tags if isinstance(tags, list) else [tags]}})
-                
-            if status:
-                must_conditions.append({'term': {'status': status}})
-            else:
-                # By default, only show approved resources
-                must_conditions.append({'term': {'status.keyword': 'approved'}})
+    @classmethod
+    def conditional_action(cls, op_type, resource_id, if_seq_no=None, if_primary_term=None):
+        """Bulk action metadata, conditional on seq_no/primary_term when both are given"""
+        metadata = {'_index': cls.index_name, '_id': resource_id, **routed_params(routing_for_id(resource_id))}
+        if if_seq_no is not None and if_primary_term is not None:
+            metadata['if_seq_no'] = int(if_seq_no)
+            metadata['if_primary_term'] = int(if_primary_term)
+        return {op_type: metadata}
 
-            body = {
-                'query': {
-                    'bool': {
-                        'must': must_conditions if must_conditions else [{'match_all': {}}]
-                    }
-                },
-                'sort': [
-                    {'_score': {'order': 'desc'}},
-                    {'created_at': {'order': 'desc'}}
-                ],
-                'from': (page - 1) * size,
-                'size': size
-            }
+    @staticmethod
+    def write_failed(error, operation):
+        """Map a failed bulk item to False (not found) or a ResourceConflictError"""
+        if error.status == 404:
+            return False
+        if error.status == 409:
+            raise ResourceConflictError(f"Resource was modified concurrently, {operation} not applied")
+        raise ResourceValidationError(f"Failed to {operation} resource: {str(error)}")
+
+    @classmethod
+    def search(cls, query=None, category=None, resource_type=None, tags=None, 
+              status='approved', page=1, size=10, cursor=None):
+        """Search for resources with filters"""
+        search_query = SearchQuery(
+            text=query,
+            category=category,
+            resource_type=resource_type,
+            tags=tags,
+            status=status,
+            page=page,
+            size=size,
+            cursor=cursor
+        )
+        return cls.search_page(search_query)
 
-            result = es.search(index=cls.index_name, body=body)
+    @classmethod
+    def search_page(cls, search_query):
+        """Run a compiled SearchQuery and format one page of results"""
+        try:
+            result = cls.query_resources(search_query)
             
-            resources = [{'id': hit['_id'], **hit['_source']} for hit in result['hits']['hits']]
-            total = result['hits']['total']['value']
+            resources = hits_to_resources(result)
+            total = search_query.total_value
+            size = search_query.size
             
             return {
                 'resources': resources,
                 'total': total,
-                'page': page,
+                'total_relation': search_query.total_relation,
+                'page': search_query.page,
                 'size': size,
-                'pages': (total + size - 1) // size
+                'pages': (total + size - 1) // size,
+                **search_query.response_meta(es, result)
             }
+        except ValueError:
+            raise
         except Exception as e:
             raise ResourceValidationError(f"Failed to search resources: {str(e)}")
 
@@ -224,7 +337,6 @@ class Resource:
     def get_all_resources(cls):
         """Get all pending resources"""
         try:
-            es = Elasticsearch()
             result = es.search(index=cls.index_name, body={
                 'query': {"match_all": {}},
                 "_source": True,
@@ -239,7 +351,6 @@ class Resource:
     def get_pending_resources(cls):
         """Get all resources"""
         try:
-            es = Elasticsearch()
             result = es.search(index=cls.index_name, body={
                 "query": {
                     "bool": {
@@ -259,83 +370,188 @@ class Resource:
             raise ResourceValidationError(f"Failed to get all resources: {str(e)}")
         
     @classmethod
-    def query_resources(cls, query=None, category=None, resource_type=None, tags=None,
-                        status=None, page=1, size=10):
-        """Search for resources with filters"""
+    def query_resources(cls, search_query):
+        """Run a compiled SearchQuery against the resource index"""
         try:
-            es = Elasticsearch()
-            result = es.search(index=cls.index_name, body={
-                'query': query,
-                "_source": True,
-                'from': (page - 1) * size,
-                'size': 100,
-                'track_total_hits': True
-            })
-            return result
+            return search_query.execute(es, cls.index_name)
+        except ValueError:
+            raise
         except Exception as e:
             raise ResourceValidationError(f"Failed to get all resources: {str(e)}")
         
     @classmethod
-    def bulk_create(cls, resources):
-        """Bulk create resources"""
+    def query_batch(cls, search_queries):
+        """Run several compiled SearchQuery objects in one _msearch"""
+        try:
+            return execute_batch(es, cls.index_name, search_queries)
+        except Exception as e:
+            raise ResourceValidationError(f"Failed to run batch search: {str(e)}")
+
+    @classmethod
+    def bulk_create(cls, resources, chunk_size=500, max_chunk_bytes=10 * 1024 * 1024,
+                    thread_count=1, refresh=True):
+        """Bulk create resources with the streaming bulk helpers
+
+        Items are validated up front, valid ones are streamed to _bulk in
+        chunks, and the index is refreshed once at the end. results holds
+        one entry per input item, in input order.
+        """
         try:
+            results = [None] * len(resources)
+            bodies = []
+            positions = []
+            for position, resource_data in enumerate(resources):
+                try:
+                    if not isinstance(resource_data, dict):
+                        raise ResourceValidationError("Each resource must be an object")
+                    resource, body = cls.build(resource_data)
+                    bodies.append(body)
+                    positions.append(position)
+                except ResourceValidationError as e:
+                    results[position] = {'index': position, 'ok': False, 'error': str(e)}
+
+            actions = (
+                {'_op_type': 'index', **cls.placement(body['resource_type']), '_source': body}
+                for body in bodies
+            )
+            options = {
+                'chunk_size': chunk_size,
+                'max_chunk_bytes': max_chunk_bytes,
+                'raise_on_error': False,
+                'raise_on_exception': False
+            }
+            if thread_count > 1:
+                stream = parallel_bulk(es, actions, thread_count=thread_count, **options)
+            else:
+                stream = streaming_bulk(es, actions, **options)
+
+            # Both helpers yield one (ok, item) per action, in action order
+            for position, body, (ok, item) in zip(positions, bodies, stream):
+                info = next(iter(item.values()))
+                if ok:
+                    results[position] = {'index': position, 'ok': True, 'id': info['_id']}
+                else:
+                    results[position] = {'index': position, 'ok': False, 'error': str(info.get('error', info))}
+
+            if bodies:
+                if refresh:
+                    es.indices.refresh(index=cls.index_name)
+                invalidate_resource_caches()
+
             success = []
             failed = []
-            
-            for resource_data in resources:
-                try:
-                    resource = cls.create(resource_data)
-                    success.append(resource)
-                except Exception as e:
-                    failed.append({
-                        'data': resource_data,
-                        'error': str(e)
-                    })
-            
+            body_by_position = dict(zip(positions, bodies))
+            for resource_data, result in zip(resources, results):
+                if result['ok']:
+                    resource = {k: v for k, v in body_by_position[result['index']].items() if k != 'suggest'}
+                    success.append({'id': result['id'], **resource})
+                else:
+                    failed.append({'data': resource_data, 'error': result['error']})
+
             return {
                 'success': success,
-                'failed': failed
+                'failed': failed,
+                'results': results
             }
         except Exception as e:
             raise ResourceValidationError(f"Failed to bulk create resources: {str(e)}")
 
+    @staticmethod
+    def suggest_input(title, tags):
+        """Completion suggester input for a resource"""
+        inputs = [title] if title else []
+        inputs.extend(tag for tag in (tags or []) if tag)
+        return {'input': inputs}
+
     @classmethod
-    def setup_index(cls):
-        """Create the resource index if it doesn't exist"""
-        if not es.indices.exists(index=cls.index_name):
-            es.indices.create(
-                index=cls.index_name,
-                body={
-                    'settings': {
-                        'analysis': {
-                            'analyzer': {
-                                'tag_analyzer': {
-                                    'type': 'custom',
-                                    'tokenizer': 'standard',
-                                    'filter': ['lowercase', 'stop']
-                                }
-                            }
+    def suggest(cls, prefix, size=5):
+        """Typeahead suggestions for approved resources, served from the prefix cache when hot"""
+        key = f"{size}:{prefix.strip().lower()}"
+        cached = suggest_cache.get(key)
+        if cached is not None:
+            return cached
+
+        generation = suggest_cache.generation
+        try:
+            result = es.search(index=cls.index_name, body={
+                '_source': ['title'],
+                'suggest': {
+                    'resources': {
+                        'prefix': prefix.strip(),
+                        'completion': {
+                            'field': 'suggest',
+                            'size': size,
+                            'skip_duplicates': True,
+                            'contexts': {'status': ['approved']}
                         }
-                    },
-                    'mappings': {
-                        'properties': {
-                            'title': {'type': 'text', 'analyzer': 'standard'},
-                            'url': {'type': 'keyword'},
-                            'description': {'type': 'text', 'analyzer': 'standard'},
-                            'category': {'type': 'keyword'},
-                            'resource_type': {'type': 'keyword'},
-                            'tags': {'type': 'text', 'analyzer': 'tag_analyzer', 'fielddata': True},
-                            'author': {'type': 'text'},
-                            'publication_date': {'type': 'date', 'format': 'strict_date_optional_time||epoch_millis'},
-                            'github_stars': {'type': 'integer'},
-                            'difficulty_level': {'type': 'keyword'},
-                            'prerequisites': {'type': 'keyword'},
-                            'submitted_by': {'type': 'keyword'},
-                            'status': {'type': 'keyword'},
-                            'admin_notes': {'type': 'text'},
-                            'created_at': {'type': 'date'},
-                            'updated_at': {'type': 'date'}
+                    }
+                }
+            })
+        except Exception as e:
+            raise ResourceValidationError(f"Failed to get suggestions: {str(e)}")
+
+        suggestions = [
+            {'text': option['text'], 'id': option['_id'], 'title': option['_source'].get('title')}
+            for option in result['suggest']['resources'][0]['options']
+        ]
+        suggest_cache.set(key, suggestions, generation)
+        return suggestions
+
+    @classmethod
+    def versioned_index(cls, version=None):
+        """Concrete index name behind the alias for a mapping version"""
+        return f"{cls.index_name}_v{version or cls.MAPPING_VERSION}"
+
+    @classmethod
+    def index_body(cls):
+        """Settings and mappings for the current mapping version"""
+        return {
+            'settings': {
+                'number_of_shards': INDEX_SHARDS,
+                'analysis': {
+                    'analyzer': {
+                        'tag_analyzer': {
+                            'type': 'custom',
+                            'tokenizer': 'standard',
+                            'filter': ['lowercase', 'stop']
                         }
                     }
                 }
-            ) 
\ No newline at end of file
+            },
+            'mappings': {
+                'properties': {
+                    'title': {'type': 'text', 'analyzer': 'standard'},
+                    'url': {'type': 'keyword'},
+                    'description': {'type': 'text', 'analyzer': 'standard'},
+                    # Filters, facets and aggregations use the .keyword doc values
+                    'category': {'type': 'text', 'fields': {'keyword': KEYWORD_SUBFIELD}},
+                    'resource_type': {'type': 'text', 'fields': {'keyword': KEYWORD_SUBFIELD}},
+                    'tags': {'type': 'text', 'analyzer': 'tag_analyzer', 'fields': {'keyword': KEYWORD_SUBFIELD}},
+                    'author': {'type': 'text'},
+                    'publication_date': {'type': 'date', 'format': 'strict_date_optional_time||epoch_millis'},
+                    'github_stars': {'type': 'integer'},
+                    'difficulty_level': {'type': 'text', 'fields': {'keyword': KEYWORD_SUBFIELD}},
+                    'prerequisites': {'type': 'keyword'},
+                    'submitted_by': {'type': 'keyword'},
+                    'status': {'type': 'keyword'},
+                    'admin_notes': {'type': 'text'},
+                    'created_at': {'type': 'date'},
+                    'updated_at': {'type': 'date'},
+                    'suggest': SUGGEST_MAPPING
+                }
+            }
+        }
+
+    @classmethod
+    def setup_index(cls):
+        """Create the versioned resource index behind the alias if neither exists"""
+        if not es.indices.exists(index=cls.index_name):
+            body = cls.index_body()
+            body['aliases'] = {cls.index_name: {'is_write_index': True}}
+            es.indices.create(index=cls.versioned_index(), body=body)
+        else:
+            # Indices created before typeahead get the field added in place;
+            # the rest of the mapping changes need scripts/migrate_index.py
+            mapping = next(iter(es.indices.get_mapping(index=cls.index_name).values()))
+            if 'suggest' not in mapping['mappings'].get('properties', {}):
+                es.indices.put_mapping(index=cls.index_name, body={'properties': {'suggest': SUGGEST_MAPPING}})
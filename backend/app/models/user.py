@@ -1,25 +1,94 @@
+import copy
+import hashlib
+from collections.abc import Mapping
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
-from elasticsearch import Elasticsearch
 from elasticsearch.exceptions import NotFoundError
 import jwt
+from app.utils.es_client import get_es
+from app.utils.bulk_writer import bulk_writer, BulkItemError
+from app.utils.routing import resource_refs
+from app.utils.cache import user_cache
+from app.utils.password_pool import password_pool, PasswordPoolBusy
+from app.utils.query_compiler import encode_cursor, decode_cursor
 
 # Add JWT configuration
 JWT_SECRET = 'your-secret-key'  # In production, use environment variable
 
-es = Elasticsearch(['http://localhost:9200'])
+es = get_es()
+
+# Changing these bumps auth_version, which revokes tokens issued before
+AUTH_FIELDS = ('role', 'password_hash')
+
+# Merges the partial doc and bumps auth_version in the same write
+AUTH_UPDATE_SCRIPT = """
+ctx._source.putAll(params.doc);
+ctx._source.auth_version = (ctx._source.auth_version == null ? 0 : ctx._source.auth_version) + 1;
+"""
+
+# Bookmark edits in one update each; the noop tells the caller nothing changed
+ADD_BOOKMARK_SCRIPT = """
+if (ctx._source.bookmarks == null) { ctx._source.bookmarks = new ArrayList(); }
+if (ctx._source.bookmarks.contains(params.resource_id)) { ctx.op = 'noop'; }
+else { ctx._source.bookmarks.add(params.resource_id); }
+"""
+
+REMOVE_BOOKMARK_SCRIPT = """
+int i = ctx._source.bookmarks == null ? -1 : ctx._source.bookmarks.indexOf(params.resource_id);
+if (i < 0) { ctx.op = 'noop'; }
+else { ctx._source.bookmarks.remove(i); }
+"""
+
+# Concurrent edits of one user's bookmarks retry on the version conflict
+BOOKMARK_RETRY_ON_CONFLICT = 5
+
+BOOKMARK_PAGE_SIZE = 50
+MAX_BOOKMARK_PAGE_SIZE = 200
+# Resources per mget while filling a bookmark page
+BOOKMARK_MGET_CHUNK = 100
 
 class UserValidationError(Exception):
     pass
 
+def normalize_email(email):
+    """Canonical form of an email address for lookups and ids"""
+    return email.strip().lower()
+
+def user_id_for_email(email):
+    """Deterministic user id, the same for every spelling of one email"""
+    return hashlib.sha1(normalize_email(email).encode('utf-8')).hexdigest()
+
+def bookmark_cursor(ids, index):
+    """Cursor for the bookmarks after ids[index]"""
+    return encode_cursor(None, [ids[index], index])
+
+def bookmark_position(ids, cursor):
+    """Where the page after cursor starts in ids
+
+    Follows the bookmark the cursor was made after, so bookmarks added or
+    removed in between do not shift the page. If that bookmark was removed
+    itself, the one that took its place comes next.
+    """
+    pit, after, phase = decode_cursor(cursor)
+    try:
+        anchor, index = after
+        index = int(index)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+    try:
+        return ids.index(anchor) + 1
+    except ValueError:
+        return min(max(index, 0), len(ids))
+
 class User:
     index_name = 'ai_users'
     
-    def __init__(self, email, password=None, name=None, role='user', bookmarks=None, created_at=None, password_hash=None):
+    def __init__(self, email, password=None, name=None, role='user', bookmarks=None, created_at=None, password_hash=None,
+                 auth_version=0):
         self.email = email
         self.name = name or email.split('@')[0]
         self.role = role
         self.bookmarks = bookmarks or []
+        self.auth_version = auth_version
         self.created_at = created_at or datetime.utcnow().isoformat()
         if password:
             self.set_password(password)
@@ -37,16 +106,45 @@ class User:
             role=data.get('role', 'user'),
             bookmarks=data.get('bookmarks', []),
             created_at=data.get('created_at'),
-            password_hash=data.get('password_hash')
+            password_hash=data.get('password_hash'),
+            auth_version=data.get('auth_version', 0)
         )
 
     def set_password(self, password):
-        """Set the password hash using werkzeug's generate_password_hash"""
-        self.password_hash = generate_password_hash(password, method='pbkdf2:sha256')
+        """Set the password hash, computed in the password pool"""
+        self.password_hash = password_pool.hash(password)
 
     def verify_password(self, password):
-        """Verify the password using werkzeug's check_password_hash"""
-        return check_password_hash(self.password_hash, password)
+        """Verify the password in the password pool"""
+        return password_pool.verify(self.password_hash, password)
+
+    def needs_rehash(self):
+        """Whether the stored hash predates the configured hash parameters"""
+        return password_pool.needs_rehash(self.password_hash)
+
+    @classmethod
+    def rehash_password(cls, user_id, password):
+        """Replace a user's hash with one using the current parameters, in the background
+
+        Called after a successful login. It is skipped when the pool is
+        busy; the next login tries again. The hash itself is not a security
+        change, so auth_version and issued tokens are left alone.
+        """
+        try:
+            future = password_pool.hash_async(password)
+        except PasswordPoolBusy:
+            return None
+
+        def store(done):
+            if done.exception() is None:
+                bulk_writer.submit(
+                    {'update': {'_index': cls.index_name, '_id': user_id}},
+                    {'doc': {'password_hash': done.result()}}
+                )
+                user_cache.delete(user_id)
+
+        future.add_done_callback(store)
+        return future
 
     def to_dict(self):
         return {
@@ -55,61 +153,83 @@ class User:
             'role': self.role,
             'bookmarks': self.bookmarks,
             'created_at': self.created_at,
-            'password_hash': self.password_hash
+            'password_hash': self.password_hash,
+            'auth_version': self.auth_version
         }
 
     def to_response_dict(self):
         """Convert to dictionary for API response (excluding sensitive data)"""
         data = self.to_dict()
         data.pop('password_hash', None)
+        data.pop('auth_version', None)
         return data
 
     @classmethod
-    def create(cls, user_data):
-        """Create a new user"""
+    def create(cls, user_data, consistent=False):
+        """Create a new user under the id derived from its email
+
+        Login reads users by id, which is realtime, so consistent=True is
+        only needed when the user must show up in searches right away.
+        """
         try:
-            # Check if user already exists
-            existing = cls.get_by_email(user_data['email'])
-            if existing:
+            email = normalize_email(user_data['email'])
+            user_id = user_id_for_email(email)
+            # Realtime check first so a duplicate never costs a password hash
+            if cls.get(user_id):
                 raise UserValidationError('Email already registered')
 
             # Create user instance
             user = cls(
-                email=user_data['email'],
+                email=email,
                 password=user_data['password'],
                 name=user_data.get('name'),
                 role=user_data.get('role', 'user')
             )
 
-            # Save to Elasticsearch
-            result = es.index(index=cls.index_name, body=user.to_dict())
-            es.indices.refresh(index=cls.index_name)
-            
+            # op_type=create makes the email unique even between concurrent registrations
+            try:
+                result = bulk_writer.write({'create': {'_index': cls.index_name, '_id': user_id}}, user.to_dict(),
+                                           consistent)
+            except BulkItemError as e:
+                if e.status == 409:
+                    raise UserValidationError('Email already registered')
+                raise
+
             return {'id': result['_id'], **user.to_response_dict()}
-        except UserValidationError as e:
+        except (UserValidationError, PasswordPoolBusy) as e:
             raise e
         except Exception as e:
             raise UserValidationError(f"Failed to create user: {str(e)}")
 
     @classmethod
     def get(cls, user_id):
-        """Get a user by ID"""
+        """Get a user by ID, always from Elasticsearch; the result refreshes the user cache"""
         try:
             result = es.get(index=cls.index_name, id=user_id)
             user = cls.from_dict(result['_source'])
             if user:
-                return {'id': result['_id'], **user.to_dict()}
+                data = {'id': result['_id'], **user.to_dict()}
+                user_cache.set(result['_id'], copy.deepcopy(data))
+                return data
             return None
         except NotFoundError:
             return None
         except Exception as e:
             raise UserValidationError(f"Failed to get user: {str(e)}")
         
+    @classmethod
+    def get_cached(cls, user_id):
+        """Get a user by ID from the user cache, falling back to get"""
+        cached = user_cache.get(user_id)
+        if cached is not None:
+            # Callers may modify the result, the cached entry must not change
+            return copy.deepcopy(cached)
+        return cls.get(user_id)
+
     @classmethod
     def get_all_user_ids(cls):
         """Get all user IDs from the Elasticsearch index"""
         try:
-            es = Elasticsearch()  # Ensure ES is properly initialized
             result = es.search(
                 index=cls.index_name,
                 body={
@@ -124,32 +244,12 @@ class User:
 
     @classmethod
     def get_by_email(cls, email):
-        """Get a user by email"""
-        try:
-            result = es.search(
-                index=cls.index_name,
-                body={
-                    'query': {
-                        'term': {
-                            'email': email.lower()
-                        }
-                    }
-                }
-            )
-            
-            hits = result['hits']['hits']
-            if hits:
-                user = cls.from_dict(hits[0]['_source'])
-                if user:
-                    return {'id': hits[0]['_id'], **user.to_dict()}
-            return None
-        except Exception as e:
-            print(f"Error in get_by_email: {str(e)}")
-            raise UserValidationError(f"Failed to get user: {str(e)}")
+        """Get a user by email with a realtime get on the id derived from it"""
+        return cls.get(user_id_for_email(email))
 
     @classmethod
-    def update(cls, user_id, user_data):
-        """Update a user"""
+    def update(cls, user_id, user_data, consistent=False):
+        """Update a user; reads by id are realtime, so waiting for a refresh is opt-in"""
         try:
             current = cls.get(user_id)
             if not current:
@@ -157,76 +257,92 @@ class User:
 
             # Don't allow email updates
             user_data.pop('email', None)
-            
-            es.update(
-                index=cls.index_name,
-                id=user_id,
-                body={'doc': user_data}
-            )
-            es.indices.refresh(index=cls.index_name)
+
+            auth_changed = any(field in user_data for field in AUTH_FIELDS)
+            if auth_changed:
+                body = {'script': {'source': AUTH_UPDATE_SCRIPT, 'params': {'doc': user_data}}}
+            else:
+                body = {'doc': user_data}
+            bulk_writer.write({'update': {'_index': cls.index_name, '_id': user_id}}, body, consistent)
+            user_cache.delete(user_id)
+            if auth_changed:
+                # Cache the new auth_version so this process rejects older tokens
+                cls.get(user_id)
             return True
         except Exception as e:
             raise UserValidationError(f"Failed to update user: {str(e)}")
 
-    def add_bookmark(self, resource_id):
-        """Add a bookmark"""
-        if resource_id not in self.bookmarks:
-            self.bookmarks.append(resource_id)
-            return True
-        return False
+    @classmethod
+    def add_bookmark(cls, user_id, resource_id):
+        """Bookmark a resource in one scripted update; False when it was already bookmarked"""
+        return cls._edit_bookmarks(user_id, ADD_BOOKMARK_SCRIPT, resource_id)
 
-    def remove_bookmark(self, resource_id):
-        """Remove a bookmark"""
-        if resource_id in self.bookmarks:
-            self.bookmarks.remove(resource_id)
-            return True
-        return False
+    @classmethod
+    def remove_bookmark(cls, user_id, resource_id):
+        """Remove a bookmark in one scripted update; False when it was not bookmarked"""
+        return cls._edit_bookmarks(user_id, REMOVE_BOOKMARK_SCRIPT, resource_id)
 
-    def get_bookmarks(self):
-        """Get all bookmarked resources"""
+    @classmethod
+    def _edit_bookmarks(cls, user_id, script, resource_id):
+        """Run a bookmark script against the stored list, so concurrent clicks cannot lose each other"""
         try:
-            print(self)
-            print("hu")
-            if not self['bookmarks']:
-                return []
-                
-            results = es.mget(
-                index='ai_resources',
-                body={'ids': self['bookmarks']}
+            result = bulk_writer.write(
+                {'update': {'_index': cls.index_name, '_id': user_id,
+                            'retry_on_conflict': BOOKMARK_RETRY_ON_CONFLICT}},
+                {'script': {'source': script, 'lang': 'painless', 'params': {'resource_id': resource_id}}}
             )
-            
-            bookmarks = []
-            for doc in results['docs']:
-                if doc['found']:
-                    self['bookmarks'].append({'id': doc['_id'], **doc['_source']})
-            
-            return self['bookmarks']
-        except Exception as e:
-            raise UserValidationError(f"Failed to get bookmarks: {str(e)}")
-        
-    def get_bookmarks_by_id(self, ids):
-        """Get all bookmarked resources"""
+        except BulkItemError as e:
+            if e.status == 404:
+                raise UserValidationError('User not found')
+            raise UserValidationError(f"Failed to update bookmarks: {str(e)}")
+        if result.get('result') == 'noop':
+            return False
+        user_cache.delete(user_id)
+        return True
+
+    @classmethod
+    def bookmark_page(cls, user_id, cursor=None, size=BOOKMARK_PAGE_SIZE, source=None):
+        """One page of a user's bookmarked resources, newest bookmark first
+
+        The stored list is in bookmark order, so the page is a slice of it
+        read backwards from the cursor. Resources are fetched with chunked
+        mgets projected to source until the page is full; ids whose resource
+        is gone are skipped and returned in 'dangling'. Raises ValueError for
+        a bad cursor or size.
+        """
+        if not 1 <= size <= MAX_BOOKMARK_PAGE_SIZE:
+            raise ValueError(f"size must be between 1 and {MAX_BOOKMARK_PAGE_SIZE}")
+        user = cls.get(user_id)
+        if not user:
+            raise UserValidationError('User not found')
+        ids = list(reversed(user.get('bookmarks') or []))
+        position = bookmark_position(ids, cursor) if cursor else 0
+
+        bookmarks = []
+        dangling = []
         try:
-            print("hu")
-            if not ids:
-                return []
-                
-            results = es.mget(
-                index='ai_resources',
-                body={'ids': ids}
-            )
-        
-            print(results)
-            self['bookmarks'] = []
-            for doc in results['docs']:
-                if doc['found']:
-                    doc['_source']['id'] = doc['_id']
-                    self['bookmarks'].append({ **doc['_source']})
-            
-            return self['bookmarks']
+            while position < len(ids) and len(bookmarks) < size:
+                chunk = ids[position:position + min(size - len(bookmarks), BOOKMARK_MGET_CHUNK)]
+                docs = resource_refs(chunk)
+                if source:
+                    docs = [{**doc, '_source': source} for doc in docs]
+                result = es.mget(index='ai_resources', body={'docs': docs})
+                for doc in result['docs']:
+                    if doc.get('found'):
+                        bookmarks.append({'id': doc['_id'], **doc.get('_source', {})})
+                    else:
+                        dangling.append(doc['_id'])
+                position += len(chunk)
         except Exception as e:
             raise UserValidationError(f"Failed to get bookmarks: {str(e)}")
-        
+
+        return {
+            'bookmarks': bookmarks,
+            'total': len(ids),
+            'dangling': dangling,
+            'next_cursor': bookmark_cursor(ids, position - 1) if position < len(ids) else None
+        }
+
 
     @classmethod
     def setup_index(cls):
@@ -248,22 +364,84 @@ class User:
                 }
             )
 
+    @classmethod
+    def token_claims(cls, user_id, user_data):
+        """Claims that let a token be checked without reading the user"""
+        return {
+            'user_id': user_id,
+            'role': user_data.get('role', 'user'),
+            'ver': user_data.get('auth_version', 0)
+        }
+
+    @classmethod
+    def verify_token(cls, token):
+        """Decode a JWT and return a TokenUser without touching Elasticsearch in the common case
+
+        The role and auth_version come from the claims. A cached user with a
+        newer auth_version revokes the token. Tokens issued before these
+        claims existed fall back to reading the user. JWT errors propagate.
+        """
+        data = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
+        cached = user_cache.get(data['user_id'])
+        if cached is not None:
+            cached = copy.deepcopy(cached)
+        if 'role' not in data or 'ver' not in data:
+            cached = cached or cls.get(data['user_id'])
+            if not cached:
+                raise UserValidationError('User not found')
+            data = {**data, **cls.token_claims(data['user_id'], cached)}
+        elif cached is not None and cached.get('auth_version', 0) != data['ver']:
+            raise UserValidationError('Token has been revoked')
+        return TokenUser(data, cached)
+
     @classmethod
     def get_from_token(cls, token):
         """Get user from JWT token"""
         try:
-            # Decode token
-            data = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
-            
-            # Get user by ID
-            user = cls.get(data['user_id'])
-            if not user:
-                raise UserValidationError('User not found')
-                
-            return user
+            return cls.verify_token(token)
+        except UserValidationError:
+            raise
         except jwt.ExpiredSignatureError:
             raise UserValidationError('Token has expired')
         except jwt.InvalidTokenError:
             raise UserValidationError('Invalid token')
         except Exception as e:
-            raise UserValidationError(f'Token validation failed: {str(e)}') 
\ No newline at end of file
+            raise UserValidationError(f'Token validation failed: {str(e)}')
+
+
+class TokenUser(Mapping):
+    """The user behind a verified token
+
+    id and role are answered from the token claims; any other field loads
+    the user document (from the user cache when possible) on first use.
+    """
+
+    def __init__(self, claims, user=None):
+        self.id = claims['user_id']
+        self.role = claims['role']
+        self.claims = claims
+        self._user = user
+
+    def load(self):
+        if self._user is None:
+            self._user = User.get_cached(self.id)
+            if self._user is None:
+                raise UserValidationError('User not found')
+        return self._user
+
+    def __getitem__(self, key):
+        if key == 'id':
+            return self.id
+        if key == 'role':
+            return self.role
+        return self.load()[key]
+
+    def __iter__(self):
+        return iter(self.load())
+
+    def __len__(self):
+        return len(self.load())
+
+    def __bool__(self):
+        # A verified token always has a user; truth tests must not load it
+        return True
@@ -18,7 +18,6 @@ def admin_required(f):
         try:
             # Get user from token
             user = User.get_from_token(token)
-            print("Hissddsd : " + user)
             if not user or user.get('role') != 'admin':
                 return jsonify({'error': 'Admin privileges required'}), 403
             return f(user, *args, **kwargs)
@@ -156,14 +155,6 @@ def approve_resource(resource_id):
         return '', 200
 
     try:
-        # Get the resource
-        resource = Resource.get(resource_id)
-        if not resource:
-            return jsonify({'error': 'Resource not found'}), 404
-
-        if resource['status'] != 'pending':
-            return jsonify({'error': 'Resource is not pending approval'}), 400
-
         # Get admin notes from request
         data = request.get_json()
         admin_notes = data.get('admin_notes', '')
@@ -177,12 +168,16 @@ def approve_resource(resource_id):
             'updated_at': datetime.utcnow().isoformat()
         }
 
-        if Resource.update(resource_id, update_data):
-            return jsonify({
-                'message': 'Resource approved successfully',
-                'resource_id': resource_id
-            })
-        return jsonify({'error': 'Failed to approve resource'}), 500
+        # One conditional write; the pending check runs on the server
+        result = Resource.moderate(resource_id, update_data)
+        if result is None:
+            return jsonify({'error': 'Resource not found'}), 404
+        if result == 'not_pending':
+            return jsonify({'error': 'Resource is not pending approval'}), 400
+        return jsonify({
+            'message': 'Resource approved successfully',
+            'resource_id': resource_id
+        })
 
     except Exception as e:
         return jsonify({'error': 'Failed to approve resource', 'details': str(e)}), 500
@@ -195,14 +190,6 @@ def reject_resource(resource_id):
         return '', 200
 
     try:
-        # Get the resource
-        resource = Resource.get(resource_id)
-        if not resource:
-            return jsonify({'error': 'Resource not found'}), 404
-
-        if resource['status'] != 'pending':
-            return jsonify({'error': 'Resource is not pending approval'}), 400
-
         # Get admin notes from request
         print("SSAdSD")
         data = request.get_json()
@@ -220,12 +207,16 @@ def reject_resource(resource_id):
             'updated_at': datetime.utcnow().isoformat()
         }
 
-        if Resource.update(resource_id, update_data):
-            return jsonify({
-                'message': 'Resource rejected successfully',
-                'resource_id': resource_id
-            })
-        return jsonify({'error': 'Failed to reject resource'}), 500
+        # One conditional write; the pending check runs on the server
+        result = Resource.moderate(resource_id, update_data)
+        if result is None:
+            return jsonify({'error': 'Resource not found'}), 404
+        if result == 'not_pending':
+            return jsonify({'error': 'Resource is not pending approval'}), 400
+        return jsonify({
+            'message': 'Resource rejected successfully',
+            'resource_id': resource_id
+        })
 
     except Exception as e:
         return jsonify({'error': 'Failed to reject resource', 'details': str(e)}), 500
@@ -243,7 +234,7 @@ def get_resource_stats(current_user):
             'aggs': {
                 'status_counts': {
                     'terms': {
-                        'field': 'status.keyword'
+                        'field': 'status'
                     }
                 },
                 'category_counts': {
@@ -3,6 +3,7 @@ from functools import wraps
 import jwt
 from datetime import datetime, timedelta
 from app.models.user import User, UserValidationError
+from app.utils.password_pool import PasswordPoolBusy
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
@@ -26,10 +27,10 @@ def token_required(f):
             return jsonify({'error': 'Token is missing'}), 401
         
         try:
-            data = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
-            current_user = User.get(data['user_id'])
-            if not current_user:
-                return jsonify({'error': 'Invalid token'}), 401
+            # Verified from the claims; the user document is only read if the route needs it
+            current_user = User.verify_token(token)
+        except UserValidationError as e:
+            return jsonify({'error': str(e)}), 401
         except jwt.ExpiredSignatureError:
             return jsonify({'error': 'Token has expired'}), 401
         except jwt.InvalidTokenError:
@@ -40,6 +41,12 @@ def token_required(f):
         return f(current_user, *args, **kwargs)
     return decorated
 
+def busy_response(error):
+    """503 with Retry-After when the password pool sheds load"""
+    response = jsonify({'error': str(error)})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
+
 @auth_bp.route('/register', methods=['POST', 'OPTIONS'])
 def register():
     """Register a new user"""
@@ -58,7 +65,7 @@ def register():
         if missing_fields:
             return jsonify({'error': f'Missing required fields: {", ".join(missing_fields)}'}), 400
 
-        # Create user
+        # Login reads the user by id, which is realtime, so there is no refresh to wait for
         user = User.create(data)
         
         return jsonify({
@@ -70,6 +77,8 @@ def register():
                 'role': user['role']
             }
         }), 201
+    except PasswordPoolBusy as e:
+        return busy_response(e)
     except UserValidationError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
@@ -114,9 +123,12 @@ def login():
 
         print("Password verified successfully")
 
+        if user.needs_rehash():
+            User.rehash_password(user_data['id'], data['password'])
+
         # Generate token
         token = jwt.encode({
-            'user_id': user_data['id'],
+            **User.token_claims(user_data['id'], user_data),
             'exp': datetime.utcnow() + timedelta(hours=JWT_EXPIRATION)
         }, JWT_SECRET)
         
@@ -124,6 +136,8 @@ def login():
             'token': token,
             'user': {'id': user_data['id'], **user.to_response_dict()}
         })
+    except PasswordPoolBusy as e:
+        return busy_response(e)
     except Exception as e:
         print(f"Login error: {str(e)}")
         return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
@@ -153,9 +167,11 @@ def update_profile(current_user):
         if not data:
             return jsonify({'error': 'No data provided'}), 400
 
-        # Don't allow password updates through this endpoint
+        # Don't allow password or role updates through this endpoint
         data.pop('password', None)
         data.pop('password_hash', None)
+        data.pop('role', None)
+        data.pop('auth_version', None)
 
         if User.update(current_user['id'], data):
             updated_data = User.get(current_user['id'])
@@ -1,19 +1,46 @@
 from flask import Blueprint, request, jsonify
 from app.routes.auth import token_required
-from app.models.user import User, UserValidationError
+from app.models.user import User, UserValidationError, BOOKMARK_PAGE_SIZE
+from app.utils.query_compiler import source_filter
 
 bookmarks_bp = Blueprint('bookmarks', __name__)
 
 @bookmarks_bp.route('/api/bookmarks', methods=['GET'])
 @token_required
 def get_bookmarks(current_user):
-    """Get user's bookmarked resources"""
+    """A page of the user's bookmarked resources, newest first
+
+    Query params: cursor (next_cursor of the previous page), size and
+    fields (defaults to the card fields). Bookmarks whose resource was
+    deleted are left out and listed under dangling.
+    """
+    try:
+        size = int(request.args.get('size', BOOKMARK_PAGE_SIZE))
+        page = User.bookmark_page(
+            current_user['id'],
+            cursor=request.args.get('cursor') or None,
+            size=size,
+            source=source_filter(request.args.get('fields', 'card'))
+        )
+        if page['dangling']:
+            print(f"Dangling bookmarks for user {current_user['id']}: {', '.join(page['dangling'])}")
+        return jsonify(page)
+    except ValueError as e:
+        return jsonify({'error': 'Invalid parameters', 'details': str(e)}), 400
+    except UserValidationError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+@bookmarks_bp.route('/api/bookmarks/ids', methods=['GET'])
+@token_required
+def get_bookmark_ids(current_user):
+    """Ids of every bookmarked resource, for marking bookmarked items in listings"""
     try:
         user = User.get(current_user['id'])
-        bookmarks = user['bookmarks']
-        bookmarks = User.get_bookmarks_by_id(user, user['bookmarks'])
-        
-        return jsonify(bookmarks)
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+        return jsonify({'ids': user.get('bookmarks') or []})
     except UserValidationError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
@@ -24,11 +51,7 @@ def get_bookmarks(current_user):
 def add_bookmark(current_user, resource_id):
     """Add a bookmark"""
     try:
-        user = User.get(current_user['id'])
-        print(user)
-        if (resource_id not in user['bookmarks']):
-            user['bookmarks'].append(resource_id)
-            User.update(current_user['id'], {'bookmarks': user['bookmarks']})
+        if User.add_bookmark(current_user['id'], resource_id):
             return jsonify({'message': 'Bookmark added successfully'})
         return jsonify({'message': 'Resource already bookmarked'})
     except UserValidationError as e:
@@ -41,10 +64,7 @@ def add_bookmark(current_user, resource_id):
 def remove_bookmark(current_user, resource_id):
     """Remove a bookmark"""
     try:
-        user = User.get(current_user['id'])
-        if resource_id in user['bookmarks']:
-            user['bookmarks'].remove(resource_id)
-            User.update(current_user['id'], {'bookmarks': user['bookmarks']})
+        if User.remove_bookmark(current_user['id'], resource_id):
             return jsonify({'message': 'Bookmark removed successfully'})
         return jsonify({'message': 'Resource not bookmarked'})
     except UserValidationError as e:
@@ -1,12 +1,24 @@
 from flask import Blueprint, request, jsonify
-from app.models.resource import Resource, ResourceValidationError
+from app.models.resource import Resource, ResourceValidationError, ResourceConflictError
 from app.utils.github import GitHub
 from app.utils.search import Search
+from app.utils.query_compiler import SearchQuery, listing_response
+from app.utils.routing import session_preference
 
 
 # Create blueprint without url_prefix (we'll add it in the route)
 resources_bp = Blueprint('resources', __name__)
 
+# Limits for the bulk tuning query params: (default, min, max)
+BULK_CHUNK_SIZE = (500, 1, 2000)
+BULK_MAX_CHUNK_BYTES = (10 * 1024 * 1024, 64 * 1024, 50 * 1024 * 1024)
+BULK_THREAD_COUNT = (1, 1, 8)
+
+def bounded_int_arg(name, limits):
+    """Integer query param clamped to limits; ValueError when it is not a number"""
+    default, low, high = limits
+    return min(max(int(request.args.get(name, default)), low), high)
+
 @resources_bp.route('/api/resources', methods=['GET', 'POST', 'OPTIONS'])
 def resources():
     """Handle resources endpoint"""
@@ -29,91 +41,11 @@ def resources():
     elif request.method == 'GET':
         try:
             print("Hwwdadads ")
-            # Get query parameters with defaults
-            page = int(request.args.get('page', 1))
-            size = int(request.args.get('size', 9))
-            category = request.args.get('category')
-            resource_type = request.args.get('resource_type')
-            sort_by = request.args.get('sort_by', 'created_at')
-            sort_order = request.args.get('sort_order', 'desc')
-            query = request.args.get('query')
-
-            # Build search query
-            search_query = {
-                'bool': {
-                    'must': [
-                        {'term': {'status': 'approved'}}  # Only return approved resources
-                    ]
-                }
-            }
-
-            # Add category filter if specified
-            if category and category != 'all':
-                search_query['bool']['must'].append({
-                    'term': {
-                        'category.keyword': category
-                    }
-                })
-
-            # Add resource type filter if specified
-            if resource_type and resource_type != 'all':
-                search_query['bool']['must'].append({
-                    'term': {
-                        'resource_type.keyword': resource_type
-                    }
-                })
-
-            # Add text search if query is provided
-            if query:
-                search_query['bool']['must'].append({
-                    'multi_match': {
-                        'query': query,
-                        'fields': ['title^3', 'description^2', 'tags', 'author'],
-                        'type': 'best_fields',
-                        'fuzziness': 'AUTO'
-                    }
-                })
-
-            # Build sort configuration
-            sort_config = [{
-                sort_by: {
-                    'order': sort_order
-                }
-            }]
-
-            # If sorting by relevance (for text search), add _score sorting
-            if query and sort_by == '_score':
-                sort_config = [{'_score': {'order': 'desc'}}] + sort_config
-
-            # Execute search
-            result = Resource.es.search(
-                index=Resource.index_name,
-                body={
-                    'query': search_query,
-                    'sort': sort_config,
-                    'from': (page - 1) * size,
-                    'size': size,
-                    'track_total_hits': True
-                }
-            )
+            search_query = SearchQuery.from_args(request.args, default_size=9, preference=session_preference(request))
+            result = Resource.query_resources(search_query)
 
             # Format response
-            resources = []
-            for hit in result['hits']['hits']:
-                resource_data = hit['_source']
-                resource_data['id'] = hit['_id']
-                resources.append(resource_data)
-
-            total_hits = result['hits']['total']['value']
-            total_pages = (total_hits + size - 1) // size
-
-            return jsonify({
-                'resources': resources,
-                'total': total_hits,
-                'page': page,
-                'size': size,
-                'total_pages': total_pages
-            })
+            return jsonify(listing_response(search_query, Resource.es, result))
 
         except ValueError as e:
             return jsonify({
@@ -144,15 +76,24 @@ def resource_by_id(resource_id):
             if not data:
                 return jsonify({'error': 'No data provided'}), 400
 
-            if Resource.update(resource_id, data):
+            # Optional optimistic concurrency control from a previous read
+            if Resource.update(resource_id, data,
+                               if_seq_no=request.args.get('if_seq_no'),
+                               if_primary_term=request.args.get('if_primary_term')):
                 return jsonify({'message': 'Resource updated successfully'})
             return jsonify({'error': 'Resource not found'}), 404
             
         elif request.method == 'DELETE':
-            if Resource.delete(resource_id):
+            if Resource.delete(resource_id,
+                               if_seq_no=request.args.get('if_seq_no'),
+                               if_primary_term=request.args.get('if_primary_term')):
                 return jsonify({'message': 'Resource deleted successfully'})
             return jsonify({'error': 'Resource not found'}), 404
             
+    except ResourceConflictError as e:
+        return jsonify({'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'error': 'Invalid parameters', 'details': str(e)}), 400
     except ResourceValidationError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
@@ -172,12 +113,20 @@ def bulk_create_resources():
         if not isinstance(data, list):
             return jsonify({'error': 'Expected a list of resources'}), 400
 
-        result = Resource.bulk_create(data)
+        result = Resource.bulk_create(
+            data,
+            chunk_size=bounded_int_arg('chunk_size', BULK_CHUNK_SIZE),
+            max_chunk_bytes=bounded_int_arg('max_chunk_bytes', BULK_MAX_CHUNK_BYTES),
+            thread_count=bounded_int_arg('thread_count', BULK_THREAD_COUNT)
+        )
         return jsonify({
             'message': 'Resources created successfully',
             'success': result['success'],
-            'failed': result['failed']
+            'failed': result['failed'],
+            'results': result['results']
         }), 201
+    except ValueError as e:
+        return jsonify({'error': 'Invalid parameters', 'details': str(e)}), 400
     except ResourceValidationError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
@@ -196,78 +145,10 @@ def get_all_resources():
     """Retrieve all resources from the database"""
 
     try:
-        page = int(request.args.get('page', 1))
-        size = int(request.args.get('size', 9))
-        category = request.args.get('category')
-        resource_type = request.args.get('resource_type')
-        sort_by = request.args.get('sort_by', 'created_at')
-        sort_order = request.args.get('sort_order', 'desc')
-        query = request.args.get('query')
-
-        # Build search query
-        search_query = {
-            'bool': {
-                'must': [
-                    {'term': {'status': 'approved'}}  # Only return approved resources
-                ]
-            }
-        }
-
-        # Add category filter if specified
-        if category and category != 'all':
-            search_query['bool']['must'].append({
-                'match': {
-                    'category': category
-                }
-            })
-        # Add resource type filter if specified
-        if resource_type and resource_type != 'all':
-            search_query['bool']['must'].append({
-                'match': {
-                    'resource_type': resource_type
-                }
-            })
-        # Add text search if query is provided
-        if query:
-            search_query['bool']['must'].append({
-                'multi_match': {
-                    'query': query,
-                    'fields': ['title^3', 'description^2', 'tags', 'author'],
-                    'type': 'best_fields',
-                    'fuzziness': 'AUTO'
-                }
-            })
-
-        # Build sort configuration
-        sort_config = [{
-            sort_by: {
-                'order': sort_order
-            }
-        }]
-        # If sorting by relevance (for text search), add _score sorting
-        if query and sort_by == '_score':
-            sort_config = [{'_score': {'order': 'desc'}}] + sort_config
+        search_query = SearchQuery.from_args(request.args, default_size=9, preference=session_preference(request))
+        result = Resource.query_resources(search_query)
 
-        print(search_query)
-        result = Resource.query_resources(search_query, sort_config, page, size)
-        #result = Resource.get_all_resources()
-
-        resources = []
-        for hit in result['hits']['hits']:
-            resource_data = hit['_source']
-            resource_data['id'] = hit['_id']
-            resources.append(resource_data)
-
-        total_hits = result['hits']['total']['value']
-        total_pages = (total_hits + size - 1) // size
-
-        return jsonify({
-            'resources': resources,
-            'total': total_hits,
-            'page': page,
-            'size': size,
-            'total_pages': total_pages
-        }), 200
+        return jsonify(listing_response(search_query, Resource.es, result)), 200
 
     except ValueError as e:
         return jsonify({
@@ -1,9 +1,15 @@
 from flask import Blueprint, request, jsonify
 from app.models.resource import Resource, ResourceValidationError
+from app.utils.query_compiler import SearchQuery, listing_response, source_filter, hits_to_resources
+from app.utils.singleflight import coalesced_search
+from app.utils.routing import session_preference
 
 # Create blueprint without url_prefix (we'll add it in the route)
 search_bp = Blueprint('search', __name__)
 
+MAX_BATCH_SIZE = 20
+MAX_SUGGESTIONS = 10
+
 @search_bp.route('/api/search', methods=['GET', 'OPTIONS'])
 def search():
     """Search resources with filters"""
@@ -11,25 +17,80 @@ def search():
         return '', 200
 
     try:
-        # Get search parameters
-        query = request.args.get('query', '')
-        category = request.args.get('category')
-        resource_type = request.args.get('type')
-        tags = request.args.get('tags', '').split(',') if request.args.get('tags') else None
-        page = int(request.args.get('page', 1))
-        size = int(request.args.get('size', 10))
+        # Get search parameters; 'type' is accepted as an alias of resource_type
+        search_query = SearchQuery.from_args(request.args, preference=session_preference(request))
 
         # Perform search
-        results = Resource.search(
-            query=query,
-            category=category,
-            resource_type=resource_type,
-            tags=tags,
-            page=page,
-            size=size
-        )
+        results = Resource.search_page(search_query)
 
         return jsonify(results)
+    except (ResourceValidationError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+@search_bp.route('/api/search/batch', methods=['POST', 'OPTIONS'])
+def search_batch():
+    """Run several named /api/resources queries in one _msearch round trip"""
+    if request.method == 'OPTIONS':
+        return '', 200
+
+    try:
+        data = request.get_json()
+        if not data or not isinstance(data, list):
+            return jsonify({'error': 'Expected a list of query specs'}), 400
+        if len(data) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'At most {MAX_BATCH_SIZE} queries per batch'}), 400
+
+        preference = session_preference(request)
+        names = []
+        queries = []
+        errors = {}
+        for spec in data:
+            if not isinstance(spec, dict) or not isinstance(spec.get('name'), str) or not spec['name']:
+                return jsonify({'error': 'Each query spec needs a string name'}), 400
+            name = spec['name']
+            if name in names or name in errors:
+                return jsonify({'error': f'Duplicate query name: {name}'}), 400
+            params = {key: value for key, value in spec.items() if key != 'name'}
+            try:
+                if 'cursor' in params:
+                    raise ValueError('Cursor pagination is not supported in batches')
+                params.setdefault('page', 1)
+                queries.append(SearchQuery.from_args(params, default_size=9, preference=preference))
+                names.append(name)
+            except (ValueError, TypeError) as e:
+                # TypeError covers values of the wrong JSON type, e.g. {"size": {}}
+                errors[name] = {'error': 'Invalid parameters', 'details': str(e)}
+
+        results = {}
+        for name, search_query, result in zip(names, queries, Resource.query_batch(queries)):
+            if isinstance(result, Exception):
+                errors[name] = {'error': 'Search failed', 'details': str(result)}
+            else:
+                results[name] = listing_response(search_query, Resource.es, result)
+
+        return jsonify({'results': results, 'errors': errors})
+    except ResourceValidationError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+@search_bp.route('/api/suggest', methods=['GET', 'OPTIONS'])
+def suggest():
+    """Typeahead suggestions for resource titles and tags"""
+    if request.method == 'OPTIONS':
+        return '', 200
+
+    try:
+        prefix = request.args.get('prefix', '')
+        if not prefix.strip():
+            return jsonify({'error': 'prefix parameter is required'}), 400
+        size = min(int(request.args.get('size', 5)), MAX_SUGGESTIONS)
+
+        return jsonify({'suggestions': Resource.suggest(prefix, size)})
+    except ValueError as e:
+        return jsonify({'error': 'Invalid parameters', 'details': str(e)}), 400
     except ResourceValidationError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
@@ -55,7 +116,7 @@ def get_categories():
             }
         }
 
-        result = Resource.es.search(index=Resource.index_name, body=body)
+        result = coalesced_search(Resource.es, Resource.index_name, body)
         categories = [bucket['key'] for bucket in result['aggregations']['categories']['buckets']]
         
         return jsonify({'categories': categories})
@@ -90,7 +151,7 @@ def get_tags():
             }
         }
 
-        result = Resource.es.search(index=Resource.index_name, body=body)
+        result = coalesced_search(Resource.es, Resource.index_name, body)
         tags = [bucket['key'] for bucket in result['aggregations']['tags']['buckets']]
         
         return jsonify({'tags': tags})
@@ -108,8 +169,8 @@ def get_trending():
         body = {
             'query': {
                 'bool': {
-                    'must': [
-                        {'term': {'status.keyword': 'approved'}}
+                    'filter': [
+                        {'term': {'status': 'approved'}}
                     ]
                 }
             },
@@ -120,9 +181,12 @@ def get_trending():
             ],
             'size': 10
         }
+        source = source_filter(request.args.get('fields'))
+        if source is not None:
+            body['_source'] = source
 
-        result = Resource.es.search(index=Resource.index_name, body=body)
-        resources = [{'id': hit['_id'], **hit['_source']} for hit in result['hits']['hits']]
+        result = coalesced_search(Resource.es, Resource.index_name, body)
+        resources = hits_to_resources(result)
         
         return jsonify({'resources': resources})
     except Exception as e:
@@ -1,45 +1,36 @@
-from elasticsearch import Elasticsearch
-from elasticsearch_dsl import Search, Q
+from elasticsearch_dsl import Search
+from app.utils.query_compiler import SearchQuery
+from app.utils.es_client import get_es
 
 class SearchService:
     def __init__(self):
-        self.es = Elasticsearch(['http://127.0.0.1:9200'])
+        self.es = get_es()
     
     def search(self, query, category=None, tags=None, page=1, size=10):
-        # Create search query
-        s = Search(using=self.es, index='ai_resources')
-        
-        # Add query
-        if query:
-            s = s.query('multi_match', query=query, fields=['title^2', 'description'])
-        
-        # Add filters
-        if category:
-            s = s.filter('term', category=category)
-        if tags:
-            s = s.filter('terms', tags=tags)
-        
-        # Add pagination
-        s = s[(page-1)*size:page*size]
-        
-        # Execute search
-        response = s.execute()
+        search_query = SearchQuery(
+            text=query,
+            category=category,
+            tags=tags,
+            page=page,
+            size=size
+        )
+        response = search_query.execute(self.es, 'ai_resources')
         
         return {
-            'total': response.hits.total.value,
+            'total': search_query.total_value,
             'page': page,
             'size': size,
-            'results': [hit.to_dict() for hit in response]
+            'results': [hit['_source'] for hit in response['hits']['hits']]
         }
     
     def get_categories(self):
         s = Search(using=self.es, index='ai_resources')
-        s.aggs.bucket('categories', 'terms', field='category')
+        s.aggs.bucket('categories', 'terms', field='category.keyword')
         response = s.execute()
         return [bucket.key for bucket in response.aggregations.categories.buckets]
     
     def get_tags(self):
         s = Search(using=self.es, index='ai_resources')
-        s.aggs.bucket('tags', 'terms', field='tags')
+        s.aggs.bucket('tags', 'terms', field='tags.keyword')
         response = s.execute()
         return [bucket.key for bucket in response.aggregations.tags.buckets] 
\ No newline at end of file
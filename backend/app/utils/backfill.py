@@ -0,0 +1,238 @@
+import importlib
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from multiprocessing import get_context
+from elasticsearch.exceptions import NotFoundError
+from elasticsearch.helpers import scan, bulk
+from app.utils.es_client import get_es
+from app.utils.index_migration import MigrationError
+
+# Progress of each named, versioned transform: which slices have been
+# written, so a rerun with resume=True only scans the rest
+STATE_INDEX = 'ai_migrations'
+CONFLICT_RETRIES = 3
+SAMPLES_PER_SLICE = 3
+
+TRANSFORMS = {}
+
+
+class Transform:
+    """A named, versioned rewrite of the documents in one index
+
+    fn takes a document source and returns the rewritten source, or None
+    when the document needs no change. It must be idempotent: slices are
+    rescanned after a crash and conflicted documents are transformed again.
+    """
+
+    def __init__(self, name, version, index, fn, description=None):
+        self.name = name
+        self.version = version
+        self.index = index
+        self.fn = fn
+        self.module = fn.__module__
+        self.description = description or (fn.__doc__ or '').strip()
+
+    @property
+    def state_id(self):
+        return f"{self.name}:v{self.version}"
+
+
+def transform(name, version, index):
+    """Register the decorated function as a transform"""
+    def register(fn):
+        TRANSFORMS[name] = Transform(name, version, index, fn)
+        return fn
+    return register
+
+
+def get_transform(module, name):
+    """Look up a transform, importing the module that registers it (used by worker processes)"""
+    if name not in TRANSFORMS:
+        importlib.import_module(module)
+    try:
+        return TRANSFORMS[name]
+    except KeyError:
+        raise MigrationError(f"Unknown transform: {name}")
+
+
+def load_state(es, migration):
+    try:
+        return es.get(index=STATE_INDEX, id=migration.state_id)['_source']
+    except NotFoundError:
+        return None
+
+
+def save_state(es, migration, state):
+    es.index(index=STATE_INDEX, id=migration.state_id, body={**state, 'updated_at': datetime.utcnow().isoformat()})
+
+
+def _write(es, hits, stats):
+    """Write transformed hits with if_seq_no/if_primary_term, returning the hits that lost a race"""
+    by_key = {(hit['_index'], hit['_id']): hit for hit in hits}
+    actions = []
+    for hit in hits:
+        action = {
+            '_op_type': 'index',
+            '_index': hit['_index'],
+            '_id': hit['_id'],
+            'if_seq_no': hit['_seq_no'],
+            'if_primary_term': hit['_primary_term'],
+            '_source': hit['_source']
+        }
+        if hit.get('_routing'):
+            action['routing'] = hit['_routing']
+        actions.append(action)
+    success, errors = bulk(es, actions, raise_on_error=False, raise_on_exception=False)
+    stats['written'] += success
+    conflicted = []
+    for error in errors:
+        info = next(iter(error.values()))
+        if info.get('status') == 409:
+            conflicted.append(by_key[(info['_index'], info['_id'])])
+        else:
+            stats['failed'] += 1
+    return conflicted
+
+
+def _refetch(es, hits):
+    """Current versions of conflicted hits, with seq_no and primary_term"""
+    docs = []
+    for hit in hits:
+        doc = {'_index': hit['_index'], '_id': hit['_id']}
+        if hit.get('_routing'):
+            doc['routing'] = hit['_routing']
+        docs.append(doc)
+    result = es.mget(body={'docs': docs})
+    hits = []
+    for doc in result['docs']:
+        if doc.get('found'):
+            hits.append({
+                '_index': doc['_index'], '_id': doc['_id'], '_routing': doc.get('_routing'),
+                '_seq_no': doc['_seq_no'], '_primary_term': doc['_primary_term'], '_source': doc['_source']
+            })
+    return hits
+
+
+def _apply(migration, hits, stats, samples):
+    """Run the transform over hits, keeping the changed ones"""
+    changed = []
+    for hit in hits:
+        stats['scanned'] += 1
+        source = migration.fn(dict(hit['_source']))
+        if source is None or source == hit['_source']:
+            continue
+        stats['changed'] += 1
+        if len(samples) < SAMPLES_PER_SLICE:
+            keys = sorted(key for key in set(source) | set(hit['_source'])
+                          if source.get(key) != hit['_source'].get(key))
+            samples.append({'id': hit['_id'], 'fields': {
+                key: [hit['_source'].get(key), source.get(key)] for key in keys
+            }})
+        changed.append({**hit, '_source': source})
+    return changed
+
+
+def run_slice(module, name, slice_id, slices, dry_run=False, batch_size=500):
+    """Transform one slice of the index; runs in a worker process with its own client"""
+    migration = get_transform(module, name)
+    es = get_es()
+    stats = {'slice': slice_id, 'scanned': 0, 'changed': 0, 'written': 0, 'conflicts': 0, 'failed': 0}
+    samples = []
+    start = time.perf_counter()
+
+    query = {'seq_no_primary_term': True, 'sort': ['_doc']}
+    if slices > 1:
+        query['slice'] = {'id': slice_id, 'max': slices}
+
+    batch = []
+
+    def flush(hits):
+        changed = _apply(migration, hits, stats, samples)
+        for attempt in range(CONFLICT_RETRIES + 1):
+            if dry_run or not changed:
+                return
+            conflicted = _write(es, changed, stats)
+            if not conflicted:
+                return
+            stats['conflicts'] += len(conflicted)
+            if attempt == CONFLICT_RETRIES:
+                stats['failed'] += len(conflicted)
+                return
+            # Someone wrote in between: transform their version instead
+            changed = _apply(migration, _refetch(es, conflicted), {'scanned': 0, 'changed': 0}, [])
+
+    for hit in scan(es, index=migration.index, query=query, size=batch_size, scroll='5m'):
+        batch.append(hit)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    stats['elapsed'] = time.perf_counter() - start
+    stats['samples'] = samples
+    return stats
+
+
+def run_migration(name, slices=4, workers=None, dry_run=False, resume=False, batch_size=500):
+    """Run a registered transform over its index with sliced scrolls across a process pool
+
+    Each slice scans its share of the index, transforms every document and
+    writes the changed ones back through _bulk, conditional on the
+    seq_no/primary_term it read. Finished slices are recorded in
+    STATE_INDEX; resume=True skips them. dry_run=True writes nothing and
+    reports what would change. Returns the per-slice stats.
+    """
+    es = get_es()
+    migration = TRANSFORMS.get(name)
+    if migration is None:
+        raise MigrationError(f"Unknown transform: {name}")
+
+    state = load_state(es, migration) if resume and not dry_run else None
+    if state and state.get('completed'):
+        print(f"✓ {migration.state_id} already completed")
+        return []
+    if state:
+        slices = state['slices']
+    state = state or {'name': migration.name, 'version': migration.version, 'slices': slices,
+                      'completed_slices': [], 'completed': False}
+    pending = [i for i in range(slices) if i not in state['completed_slices']]
+    mode = 'dry run' if dry_run else 'write'
+    print(f"→ {migration.state_id} on {migration.index}: {len(pending)}/{slices} slices ({mode})")
+
+    results = []
+    start = time.perf_counter()
+    # spawn so every worker builds its own client instead of sharing sockets
+    with ProcessPoolExecutor(max_workers=workers or min(slices, 8), mp_context=get_context('spawn')) as pool:
+        futures = {
+            pool.submit(run_slice, migration.module, name, slice_id, slices, dry_run, batch_size): slice_id
+            for slice_id in pending
+        }
+        for future in as_completed(futures):
+            stats = future.result()
+            results.append(stats)
+            print(f"  slice {stats['slice']}: {stats['scanned']} scanned, {stats['changed']} changed, "
+                  f"{stats['written']} written, {stats['conflicts']} conflicts, {stats['failed']} failed "
+                  f"in {stats['elapsed']:.1f}s")
+            for sample in stats['samples'] if dry_run else []:
+                print(f"    {sample['id']}: {sample['fields']}")
+            if not dry_run and not stats['failed']:
+                state['completed_slices'].append(stats['slice'])
+                save_state(es, migration, state)
+
+    elapsed = time.perf_counter() - start
+    scanned = sum(stats['scanned'] for stats in results)
+    written = sum(stats['written'] for stats in results)
+    failed = sum(stats['failed'] for stats in results)
+    print(f"✓ {scanned} scanned, {sum(stats['changed'] for stats in results)} changed, {written} written, "
+          f"{failed} failed in {elapsed:.1f}s ({scanned / max(elapsed, 1e-9):.0f} docs/s scanned, "
+          f"{written / max(elapsed, 1e-9):.0f} docs/s written)")
+
+    if not dry_run:
+        if written:
+            es.indices.refresh(index=migration.index)
+        if len(state['completed_slices']) == slices:
+            state['completed'] = True
+            save_state(es, migration, state)
+    return results
@@ -0,0 +1,172 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from app.utils.es_client import get_es
+
+# Refresh policy for writes: 'none' leaves visibility to the index refresh
+# interval, 'wait_for' holds the response until the next refresh, 'refresh'
+# forces one. Callers that must read their own writes opt in per write.
+REFRESH_POLICIES = {'none': 'false', 'wait_for': 'wait_for', 'refresh': 'true'}
+WRITE_REFRESH_POLICY = os.getenv('WRITE_REFRESH_POLICY', 'none')
+
+# Writes arriving within this window are sent as one _bulk request
+WRITE_BATCH_WINDOW = float(os.getenv('WRITE_BATCH_WINDOW_MS', 10)) / 1000
+WRITE_BATCH_MAX_ACTIONS = int(os.getenv('WRITE_BATCH_MAX_ACTIONS', 500))
+WRITE_TIMEOUT = float(os.getenv('WRITE_TIMEOUT', 30))
+# Batches that wait for a refresh are sent from these threads, so they do
+# not hold up the writes queued behind them
+WRITE_REFRESH_THREADS = int(os.getenv('WRITE_REFRESH_THREADS', 4))
+
+# Weakest to strongest; a batch uses the strongest refresh any item asked for
+_REFRESH_ORDER = ['false', 'wait_for', 'true']
+
+
+class BulkItemError(Exception):
+    """A single action in a _bulk request failed"""
+
+    def __init__(self, status, error):
+        self.status = status
+        self.error = error
+        reason = error.get('reason', error) if isinstance(error, dict) else error
+        super().__init__(f"{status}: {reason}")
+
+
+def refresh_param(consistent=False):
+    """refresh value for a write, 'wait_for' when the caller needs to read it back"""
+    if WRITE_REFRESH_POLICY not in REFRESH_POLICIES:
+        raise ValueError(f"WRITE_REFRESH_POLICY must be one of: {', '.join(REFRESH_POLICIES)}")
+    if consistent:
+        return 'wait_for' if WRITE_REFRESH_POLICY != 'refresh' else 'true'
+    return REFRESH_POLICIES[WRITE_REFRESH_POLICY]
+
+
+class _PendingWrite:
+    def __init__(self, action, source, refresh):
+        self.action = action
+        self.source = source
+        self.refresh = refresh
+        self.future = Future()
+
+
+class BulkWriter:
+    """Background thread that coalesces concurrent single-document writes into _bulk calls"""
+
+    def __init__(self, window=WRITE_BATCH_WINDOW, max_actions=WRITE_BATCH_MAX_ACTIONS):
+        self.window = window
+        self.max_actions = max_actions
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._refresh_executor = None
+        # (index, id) -> send future of the refreshing batch last writing it
+        self._refreshing = {}
+        self.batches = 0
+        self.actions = 0
+
+    def submit(self, action, source=None, consistent=False):
+        """Queue one bulk action (and its source line) and return a Future for its item result"""
+        pending = _PendingWrite(action, source, refresh_param(consistent))
+        self._ensure_started()
+        self._queue.put(pending)
+        return pending.future
+
+    def write(self, action, source=None, consistent=False):
+        """Queue one action and wait for its item result, raising BulkItemError on failure"""
+        info = self.submit(action, source, consistent).result(timeout=WRITE_TIMEOUT)
+        if info.get('status', 500) >= 300:
+            raise BulkItemError(info.get('status'), info.get('error', info.get('result')))
+        return info
+
+    def stats(self):
+        """Counters for monitoring"""
+        return {
+            'batches': self.batches,
+            'actions': self.actions,
+            'queued': self._queue.qsize()
+        }
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='bulk-writer', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_actions:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch):
+        body = []
+        for pending in batch:
+            body.append(pending.action)
+            if pending.source is not None:
+                body.append(pending.source)
+        refresh = max((pending.refresh for pending in batch), key=_REFRESH_ORDER.index)
+
+        # A document still being written by a refreshing batch keeps its order
+        keys = {key for key in map(_document_key, batch) if key}
+        with self._lock:
+            earlier = {self._refreshing[key] for key in keys if key in self._refreshing}
+        if earlier:
+            wait(earlier)
+
+        if refresh == 'false':
+            self._send(batch, body, refresh)
+            return
+
+        sent = self._executor().submit(self._send, batch, body, refresh)
+        with self._lock:
+            for key in keys:
+                self._refreshing[key] = sent
+        sent.add_done_callback(lambda done: self._forget(keys, done))
+
+    def _send(self, batch, body, refresh):
+        try:
+            response = get_es().bulk(body=body, refresh=refresh)
+        except Exception as e:
+            for pending in batch:
+                pending.future.set_exception(e)
+            return
+
+        with self._lock:
+            self.batches += 1
+            self.actions += len(batch)
+        for pending, item in zip(batch, response['items']):
+            pending.future.set_result(next(iter(item.values())))
+
+    def _executor(self):
+        if self._refresh_executor is None:
+            self._refresh_executor = ThreadPoolExecutor(max_workers=WRITE_REFRESH_THREADS,
+                                                        thread_name_prefix='bulk-refresh')
+        return self._refresh_executor
+
+    def _forget(self, keys, done):
+        with self._lock:
+            for key in keys:
+                if self._refreshing.get(key) is done:
+                    del self._refreshing[key]
+
+
+def _document_key(pending):
+    """(index, id) a write targets, None for index actions with a generated id"""
+    meta = next(iter(pending.action.values()))
+    if meta.get('_id') is None:
+        return None
+    return meta.get('_index'), meta['_id']
+
+
+# Shared by the models for single-document writes
+bulk_writer = BulkWriter()
@@ -0,0 +1,245 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ResultCache:
+    """Thread-safe LRU cache with a TTL, a byte budget and write-generation invalidation"""
+
+    def __init__(self, max_entries=1000, max_bytes=32 * 1024 * 1024, ttl=30):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return the cached value or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, generation, expires_at = entry
+            if generation != self.generation or expires_at < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, generation=None):
+        """Store value unless a write happened since generation was read"""
+        size = len(json.dumps(value, default=str))
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return False
+            if size > self.max_bytes:
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, self.generation, time.monotonic() + self.ttl)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+            return True
+
+    def delete(self, key):
+        """Drop one entry"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self.invalidations += 1
+
+    def bump_generation(self):
+        """Invalidate every cached entry after a write"""
+        with self._lock:
+            self.generation += 1
+            self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+        return self.generation
+
+    def stats(self):
+        """Counters for monitoring"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'generation': self.generation,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+    def _remove(self, key):
+        value, size, generation, expires_at = self._entries.pop(key)
+        self._bytes -= size
+
+
+class CountCache:
+    """Hit counts per query, refreshed in the background once they go stale"""
+
+    def __init__(self, max_entries=1000, ttl=60, workers=2):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._counts = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='count-refresh')
+        self.refreshes = 0
+        self.failures = 0
+
+    def peek(self, key):
+        """Return the last known count without scheduling anything"""
+        with self._lock:
+            entry = self._counts.get(key)
+            return entry[0] if entry else None
+
+    def get(self, key, count_fn):
+        """Return the last known count, refreshing it in the background when missing or stale"""
+        with self._lock:
+            entry = self._counts.get(key)
+            if entry:
+                self._counts.move_to_end(key)
+            stale = entry is None or entry[1] < time.monotonic()
+            if stale and key not in self._refreshing:
+                self._refreshing.add(key)
+                self._executor.submit(self._refresh, key, count_fn)
+            return entry[0] if entry else None
+
+    def stats(self):
+        """Counters for monitoring"""
+        with self._lock:
+            return {
+                'entries': len(self._counts),
+                'refreshing': len(self._refreshing),
+                'refreshes': self.refreshes,
+                'failures': self.failures
+            }
+
+    def _refresh(self, key, count_fn):
+        try:
+            value = count_fn()
+            with self._lock:
+                self._counts[key] = (value, time.monotonic() + self.ttl)
+                self._counts.move_to_end(key)
+                while len(self._counts) > self.max_entries:
+                    self._counts.popitem(last=False)
+                self.refreshes += 1
+        except Exception as e:
+            print(f"Count refresh failed: {str(e)}")
+            with self._lock:
+                self.failures += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+
+# Shared cache for resource search results
+search_cache = ResultCache(
+    max_entries=int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', 1000)),
+    max_bytes=int(os.getenv('SEARCH_CACHE_MAX_BYTES', 32 * 1024 * 1024)),
+    ttl=float(os.getenv('SEARCH_CACHE_TTL', 30))
+)
+
+# Hot typeahead prefixes
+suggest_cache = ResultCache(
+    max_entries=int(os.getenv('SUGGEST_CACHE_MAX_ENTRIES', 2000)),
+    max_bytes=int(os.getenv('SUGGEST_CACHE_MAX_BYTES', 4 * 1024 * 1024)),
+    ttl=float(os.getenv('SUGGEST_CACHE_TTL', 60))
+)
+
+
+# User documents fetched for authenticated requests, keyed by user id.
+# User.update drops the entry in this process; other processes see the
+# change once their entry expires.
+user_cache = ResultCache(
+    max_entries=int(os.getenv('USER_CACHE_MAX_ENTRIES', 10000)),
+    max_bytes=int(os.getenv('USER_CACHE_MAX_BYTES', 8 * 1024 * 1024)),
+    ttl=float(os.getenv('USER_CACHE_TTL', 300))
+)
+
+
+# Writes without a refresh become searchable at the next index refresh
+# (refresh_interval, 1s by default). A search that runs before then reads
+# the old document and would cache it under the new generation, so the
+# caches are invalidated again once this long has passed since the last write.
+CACHE_SETTLE_SECONDS = float(os.getenv('CACHE_SETTLE_MS', 1500)) / 1000
+
+
+class DeferredInvalidation:
+    """Runs fn once delay has passed since the last schedule() call"""
+
+    def __init__(self, fn, delay):
+        self.fn = fn
+        self.delay = delay
+        self._deadline = 0
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def schedule(self):
+        with self._lock:
+            self._deadline = time.monotonic() + self.delay
+            if self._timer is None:
+                self._start(self.delay)
+
+    def _start(self, delay):
+        self._timer = threading.Timer(delay, self._fire)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _fire(self):
+        with self._lock:
+            remaining = self._deadline - time.monotonic()
+            if remaining > 0:
+                # Written to again meanwhile: wait out that write's refresh too
+                self._start(remaining)
+                return
+            self._timer = None
+        self.fn()
+
+
+def _bump_resource_caches():
+    search_cache.bump_generation()
+    suggest_cache.bump_generation()
+
+
+_settled_invalidation = DeferredInvalidation(_bump_resource_caches, CACHE_SETTLE_SECONDS)
+
+
+def invalidate_resource_caches():
+    """Drop cached search results and suggestions after a resource write
+
+    They are dropped again once the write has had time to become
+    searchable, discarding anything cached from pre-refresh reads.
+    """
+    _bump_resource_caches()
+    if CACHE_SETTLE_SECONDS > 0:
+        _settled_invalidation.schedule()
+
+
+# Background-refreshed totals for the 'cached' total hits policy
+count_cache = CountCache(
+    max_entries=int(os.getenv('COUNT_CACHE_MAX_ENTRIES', 1000)),
+    ttl=float(os.getenv('COUNT_CACHE_TTL', 60))
+)
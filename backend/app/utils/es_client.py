@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+from elasticsearch import Elasticsearch, Transport
+from elasticsearch.exceptions import TransportError
+
+_client = None
+_lock = threading.Lock()
+
+
+def _flag(name, default):
+    return os.getenv(name, default).lower() in ('1', 'true', 'yes')
+
+
+def seed_hosts():
+    """Seed nodes from ELASTICSEARCH_HOSTS (comma separated) or ELASTICSEARCH_HOST"""
+    hosts = os.getenv('ELASTICSEARCH_HOSTS') or os.getenv('ELASTICSEARCH_HOST', 'http://127.0.0.1:9200')
+    return [host.strip() for host in hosts.split(',') if host.strip()]
+
+
+class SeedFallbackTransport(Transport):
+    """Transport whose sniffing never fails a request or the client constructor
+
+    The stock transport sniffs inside the constructor and raises when no node
+    answers, so building the client at import fails while the seeds are down.
+    Here the startup sniff runs on the first request instead, and a failed
+    sniff keeps the nodes already known and is retried after the interval.
+    """
+
+    def __init__(self, hosts, sniff_on_start=False, **kwargs):
+        super().__init__(hosts, **kwargs)
+        if sniff_on_start and self.sniffer_timeout:
+            # Due immediately, so the first request sniffs
+            self.last_sniff = 0.0
+
+    def sniff_hosts(self, initial=False):
+        try:
+            super().sniff_hosts(initial)
+        except TransportError as e:
+            # Wait a full interval rather than sniffing again on every request
+            self.last_sniff = time.time()
+            print(f"Sniffing failed, keeping {len(self.connection_pool.connections)} known nodes: {e}")
+
+
+def es_settings():
+    """Client settings from the environment"""
+    hosts = seed_hosts()
+    # Sniffing replaces the seeds with the cluster's published http
+    # addresses, so it defaults on only when several seeds are given
+    sniff = _flag('ELASTICSEARCH_SNIFF', 'true' if len(hosts) > 1 else 'false')
+    return {
+        'hosts': hosts,
+        # urllib3 connections per node; they are kept alive and reused
+        'maxsize': int(os.getenv('ELASTICSEARCH_POOL_SIZE', 25)),
+        'timeout': float(os.getenv('ELASTICSEARCH_TIMEOUT', 10)),
+        'max_retries': int(os.getenv('ELASTICSEARCH_MAX_RETRIES', 3)),
+        'retry_on_timeout': _flag('ELASTICSEARCH_RETRY_ON_TIMEOUT', 'true'),
+        'http_compress': _flag('ELASTICSEARCH_HTTP_COMPRESS', 'false'),
+        'headers': {'Connection': 'keep-alive'},
+        # Discover the data nodes on the first request, again when a node
+        # fails and every ELASTICSEARCH_SNIFF_INTERVAL seconds
+        'transport_class': SeedFallbackTransport,
+        'sniff_on_start': sniff,
+        'sniff_on_connection_fail': sniff,
+        'sniffer_timeout': float(os.getenv('ELASTICSEARCH_SNIFF_INTERVAL', 60)) if sniff else None,
+        'sniff_timeout': float(os.getenv('ELASTICSEARCH_SNIFF_TIMEOUT', 2)),
+        # A failed node is skipped for dead_timeout seconds, doubling on each
+        # consecutive failure up to timeout_cutoff doublings
+        'dead_timeout': float(os.getenv('ELASTICSEARCH_DEAD_TIMEOUT', 60)),
+        'timeout_cutoff': int(os.getenv('ELASTICSEARCH_DEAD_TIMEOUT_CUTOFF', 5)),
+        'retry_on_status': (502, 503, 504)
+    }
+
+
+def create_client():
+    """New client on the seed nodes; it makes no request until first used"""
+    settings = es_settings()
+    hosts = settings.pop('hosts')
+    return Elasticsearch(hosts, **settings)
+
+
+def get_es():
+    """Shared Elasticsearch client for the whole backend"""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = create_client()
+    return _client
+
+
+def pool_stats():
+    """Per-node connection pool stats, including nodes currently backed off"""
+    if _client is None:
+        return {'nodes': [], 'dead_nodes': []}
+    transport = _client.transport
+    connection_pool = transport.connection_pool
+    dead_count = getattr(connection_pool, 'dead_count', {})
+    nodes = []
+    for connection in connection_pool.connections:
+        pool = getattr(connection, 'pool', None)
+        nodes.append({
+            'host': connection.host,
+            'pool_size': pool.pool.maxsize if pool is not None and pool.pool is not None else None,
+            'available_slots': pool.pool.qsize() if pool is not None and pool.pool is not None else None,
+            'connections_opened': getattr(pool, 'num_connections', None),
+            'requests': getattr(pool, 'num_requests', None),
+            'failures': dead_count.get(connection, 0)
+        })
+    now = time.time()
+    dead_nodes = [
+        {
+            'host': connection.host,
+            'retry_in': max(0.0, round(dead_until - now, 1)),
+            'failures': dead_count.get(connection, 0)
+        }
+        for dead_until, connection in list(getattr(getattr(connection_pool, 'dead', None), 'queue', []))
+    ]
+    return {
+        'seeds': seed_hosts(),
+        'nodes': nodes,
+        'dead_nodes': dead_nodes,
+        'last_sniff': getattr(transport, 'last_sniff', None)
+    }
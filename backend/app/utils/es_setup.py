@@ -1,13 +1,13 @@
-from datetime import datetime
-from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk
 from elasticsearch.exceptions import ConnectionError
 import time
 import sys
+from app.models.resource import Resource
+from app.utils.es_client import get_es
+from app.utils.seeding import seed_resources, print_seed_summary
 
 def get_elasticsearch_client():
     """Get Elasticsearch client with connection retry"""
-    es = Elasticsearch(['http://127.0.0.1:9200'])
+    es = get_es()
     retry_count = 0
     max_retries = 3
     
@@ -32,82 +32,57 @@ def get_elasticsearch_client():
 # Initialize Elasticsearch client
 es = get_elasticsearch_client()
 
-# Define index mapping
-index_mapping = {
-    "mappings": {
-        "properties": {
-            "title": { "type": "text" },
-            "url": { "type": "keyword" },
-            "description": { "type": "text" },
-            "tags": { "type": "keyword" },
-            "category": { "type": "keyword" },
-            "source": { "type": "keyword" },
-            "created_at": { "type": "date" }
-        }
-    }
-}
-
-# Sample data for testing
+# Sample data for testing, shaped like approved submissions
 sample_data = [
     {
         "title": "Deep Learning with PyTorch",
         "url": "https://pytorch.org/tutorials/",
         "description": "Comprehensive guide to deep learning using PyTorch framework",
         "tags": ["deep-learning", "pytorch", "neural-networks"],
-        "category": "tutorial",
-        "source": "pytorch",
-        "created_at": datetime.utcnow().isoformat()
+        "category": "Tutorial",
+        "resource_type": "Tutorial",
+        "author": "PyTorch",
+        "status": "approved"
     },
     {
         "title": "Machine Learning Course by Stanford",
         "url": "https://www.coursera.org/learn/machine-learning",
         "description": "Andrew Ng's famous Machine Learning course on Coursera",
         "tags": ["machine-learning", "basics", "algorithms"],
-        "category": "course",
-        "source": "coursera",
-        "created_at": datetime.utcnow().isoformat()
+        "category": "Course",
+        "resource_type": "Course",
+        "author": "Coursera",
+        "status": "approved"
     },
     {
         "title": "TensorFlow Documentation",
         "url": "https://www.tensorflow.org/guide",
         "description": "Official TensorFlow documentation and guides",
         "tags": ["tensorflow", "deep-learning", "documentation"],
-        "category": "documentation",
-        "source": "tensorflow",
-        "created_at": datetime.utcnow().isoformat()
+        "category": "Documentation",
+        "resource_type": "Documentation",
+        "author": "TensorFlow",
+        "status": "approved"
     }
 ]
 
 def create_index():
-    """Create the Elasticsearch index if it doesn't exist"""
+    """Create the resource index and alias if they don't exist"""
     try:
-        if not es.indices.exists(index='ai_resources'):
-            es.indices.create(index='ai_resources', body=index_mapping)
-            print("Index 'ai_resources' created successfully")
-        else:
-            print("Index 'ai_resources' already exists")
+        Resource.setup_index()
     except Exception as e:
         print(f"Error creating index: {str(e)}")
         sys.exit(1)
 
 def index_sample_data():
-    """Index sample data into Elasticsearch"""
+    """Load the sample data unless this version of it is already in the index"""
     try:
-        actions = [
-            {
-                '_index': 'ai_resources',
-                '_source': doc
-            }
-            for doc in sample_data
-        ]
-        success, failed = bulk(es, actions, stats_only=True)
-        print(f"Indexed {success} documents successfully")
-        if failed:
-            print(f"Failed to index {failed} documents")
+        summary = seed_resources('sample_resources', sample_data)
+        print_seed_summary('sample_resources', summary)
     except Exception as e:
         print(f"Error indexing sample data: {str(e)}")
         sys.exit(1)
 
 if __name__ == "__main__":
     create_index()
-    index_sample_data() 
\ No newline at end of file
+    index_sample_data()
@@ -0,0 +1,103 @@
+import time
+
+
+class MigrationError(Exception):
+    pass
+
+
+def resolve_alias(es, alias):
+    """Concrete index behind alias; a legacy concrete index with that name is returned as-is"""
+    if es.indices.exists_alias(name=alias):
+        indices = list(es.indices.get_alias(name=alias).keys())
+        if len(indices) != 1:
+            raise MigrationError(f"Alias {alias} points at {len(indices)} indices, expected 1")
+        return indices[0]
+    if es.indices.exists(index=alias):
+        return alias
+    return None
+
+
+def set_write_block(es, index, blocked):
+    es.indices.put_settings(index=index, body={'index': {'blocks': {'write': True if blocked else None}}})
+
+
+def migrate_index(es, alias, new_index, body, script=None, slices='auto', keep_old=True, params=None):
+    """Reindex alias into new_index with body, verify the counts and swap the alias atomically
+
+    Reads keep hitting the old index until the swap. new_index is loaded
+    with refreshes and replicas off, and those settings are restored
+    before the counts are compared. script is an optional painless
+    transform applied to every document during the reindex, with params.
+    It may also set ctx._id and ctx._routing. The source is write-blocked
+    from the start of the reindex until the swap, so writes made meanwhile
+    fail loudly instead of being lost; the block is lifted afterwards or on
+    failure.
+    """
+    source = resolve_alias(es, alias)
+    if source is None:
+        raise MigrationError(f"Nothing to migrate: {alias} does not exist")
+    if source == new_index:
+        print(f"✓ {alias} already points at {new_index}")
+        return {'source': source, 'dest': new_index, 'migrated': False}
+
+    if es.indices.exists(index=new_index):
+        raise MigrationError(f"{new_index} already exists; delete it or pick another version")
+
+    body = dict(body)
+    settings = dict(body.get('settings', {}))
+    replicas = settings.get('number_of_replicas', 1)
+    settings.update({'refresh_interval': '-1', 'number_of_replicas': 0})
+    body['settings'] = settings
+    es.indices.create(index=new_index, body=body)
+    print(f"✓ Created {new_index}")
+
+    # Reads carry on; writes get a cluster block error until the swap
+    set_write_block(es, source, True)
+    swapped = False
+    try:
+        reindex_body = {
+            'source': {'index': source},
+            'dest': {'index': new_index, 'op_type': 'create'},
+            'conflicts': 'proceed'
+        }
+        if script:
+            reindex_body['script'] = {'source': script, 'lang': 'painless', 'params': params or {}}
+
+        start = time.perf_counter()
+        result = es.reindex(body=reindex_body, slices=slices, wait_for_completion=True, request_timeout=3600)
+        elapsed = time.perf_counter() - start
+        failures = result.get('failures', [])
+        print(f"✓ Reindexed {result.get('created', 0)} documents from {source} in {elapsed:.1f}s")
+        if failures:
+            raise MigrationError(f"Reindex reported {len(failures)} failures, first: {failures[0]}")
+
+        es.indices.put_settings(index=new_index, body={
+            'index': {'refresh_interval': None, 'number_of_replicas': replicas}
+        })
+        es.indices.refresh(index=new_index)
+
+        source_count = es.count(index=source)['count']
+        dest_count = es.count(index=new_index)['count']
+        if source_count != dest_count:
+            raise MigrationError(f"Count mismatch: {source} has {source_count}, {new_index} has {dest_count}")
+        print(f"✓ Counts match: {dest_count}")
+
+        if source == alias:
+            # Legacy concrete index named like the alias: drop it in the same atomic step
+            actions = [{'remove_index': {'index': source}}]
+        else:
+            actions = [{'remove': {'index': source, 'alias': alias}}]
+        actions.append({'add': {'index': new_index, 'alias': alias, 'is_write_index': True}})
+        es.indices.update_aliases(body={'actions': actions})
+        swapped = True
+        print(f"✓ {alias} now points at {new_index}")
+    finally:
+        # A legacy source is gone after the swap
+        if not (swapped and source == alias):
+            set_write_block(es, source, False)
+
+    if not keep_old and source != alias:
+        es.indices.delete(index=source)
+        print(f"✓ Deleted {source}")
+
+    return {'source': source, 'dest': new_index, 'migrated': True, 'count': dest_count}
@@ -0,0 +1,129 @@
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from multiprocessing import get_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# werkzeug method string for new hashes, e.g. 'pbkdf2:sha256:1000000' or
+# 'scrypt:32768:8:1'. Stored hashes made with other parameters are
+# rehashed on the next successful login.
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000000')
+
+# Hashing runs in worker processes so a login burst cannot starve the
+# request threads. 0 workers hashes inline on the calling thread.
+PASSWORD_POOL_WORKERS = int(os.getenv('PASSWORD_POOL_WORKERS', min(os.cpu_count() or 2, 4)))
+# Hashes queued beyond the running ones; past that callers get PasswordPoolBusy
+PASSWORD_POOL_MAX_QUEUE = int(os.getenv('PASSWORD_POOL_MAX_QUEUE', 32))
+PASSWORD_POOL_TIMEOUT = float(os.getenv('PASSWORD_POOL_TIMEOUT', 10))
+
+
+class PasswordPoolBusy(Exception):
+    """Too many password hashes in flight; the caller should retry later"""
+
+    def __init__(self, message="Too many sign-in requests, try again shortly", retry_after=1):
+        self.retry_after = retry_after
+        super().__init__(message)
+
+
+def hash_method(password_hash):
+    """Method and parameters a stored werkzeug hash was made with"""
+    return password_hash.split('$', 1)[0] if password_hash else None
+
+
+class PasswordPool:
+    """Bounded process pool for password hashing and verification"""
+
+    def __init__(self, workers=PASSWORD_POOL_WORKERS, max_queue=PASSWORD_POOL_MAX_QUEUE,
+                 timeout=PASSWORD_POOL_TIMEOUT, method=PASSWORD_HASH_METHOD):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.method = method
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(workers + max_queue) if workers else None
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def hash(self, password):
+        """Hash password with the configured method"""
+        return self.run(generate_password_hash, password, self.method)
+
+    def hash_async(self, password):
+        """Future for a hash with the configured method, raising PasswordPoolBusy when full"""
+        return self.submit(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """Check password against a stored hash"""
+        return self.run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """Whether a stored hash was made with other parameters than the configured ones"""
+        return hash_method(password_hash) != self.method
+
+    def submit(self, fn, *args):
+        """Queue fn in the pool, raising PasswordPoolBusy when the queue is full"""
+        if not self.workers:
+            future = Future()
+            future.set_result(fn(*args))
+            return future
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordPoolBusy()
+        with self._lock:
+            self.in_flight += 1
+        try:
+            future = self._pool().submit(fn, *args)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def run(self, fn, *args):
+        """Run fn in the pool and wait for it"""
+        if not self.workers:
+            return fn(*args)
+        future = self.submit(fn, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise PasswordPoolBusy("Sign-in is taking too long, try again shortly")
+
+    def stats(self):
+        """Counters for monitoring"""
+        with self._lock:
+            return {
+                'method': self.method,
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'in_flight': self.in_flight,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts
+            }
+
+    def _pool(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # spawn: forking a threaded server process is unsafe
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context('spawn'))
+        return self._executor
+
+    def _release(self, future):
+        with self._lock:
+            self.in_flight -= 1
+            if future is not None:
+                self.completed += 1
+        self._slots.release()
+
+
+# Shared by the user model for all password work
+password_pool = PasswordPool()
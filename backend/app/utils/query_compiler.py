@@ -0,0 +1,670 @@
+import base64
+import binascii
+import json
+import os
+from elasticsearch.exceptions import NotFoundError
+from app.utils.cache import search_cache, count_cache
+from app.utils.singleflight import search_flight
+from app.utils.routing import search_routing, routed_params
+
+# Fields used for full text matching, with boosts
+SEARCH_FIELDS = ['title^3', 'description^2', 'tags', 'author']
+
+# Exact-match filter fields. These run in filter context so they are not
+# scored and can be served from the node query cache.
+FILTER_FIELDS = {
+    'status': 'status',
+    'category': 'category.keyword',
+    'resource_type': 'resource_type.keyword',
+    'tags': 'tags.keyword',
+    'difficulty_level': 'difficulty_level.keyword'
+}
+
+# Filters that are also returned as facet counts, in clause order
+FACETS = ('category', 'resource_type', 'tags', 'difficulty_level')
+FACET_SIZE = 50
+
+SORT_ORDERS = ('asc', 'desc')
+
+# Deep pagination: from/size is rejected past the index result window, and
+# cursors keep a point-in-time open between pages
+MAX_RESULT_WINDOW = 10000
+PIT_KEEP_ALIVE = '2m'
+
+# Text matching: 'adaptive' runs an exact multi_match first and only falls
+# back to fuzzy expansion when it finds fewer than FUZZY_MIN_HITS hits
+MATCH_MODES = ('adaptive', 'exact', 'fuzzy')
+FUZZY_MIN_HITS = 3
+MAX_SUGGESTIONS = 3
+
+# Total hit counting: 'exact' counts every match, 'capped' stops at
+# TOTAL_HITS_CAP and reports a lower bound, 'cached' skips counting in the
+# search and serves a per-query count refreshed in the background
+TOTAL_POLICIES = ('exact', 'capped', 'cached')
+TOTAL_HITS_POLICY = os.getenv('TOTAL_HITS_POLICY', 'capped')
+TOTAL_HITS_CAP = int(os.getenv('TOTAL_HITS_CAP', 10000))
+
+# Field projection presets for the fields= parameter. 'card' is what the
+# resource cards render.
+FIELD_PRESETS = {
+    'card': ['title', 'url', 'description', 'category', 'resource_type', 'tags', 'author',
+             'difficulty_level', 'github_stars', 'publication_date', 'created_at']
+}
+
+# Highlighted description fragments replace the full text when requested
+HIGHLIGHT_FRAGMENT_SIZE = 160
+HIGHLIGHT_FRAGMENTS = 2
+
+# Stored mustache template for the resource search shape. Routes only send
+# the scalar params; the template renders the same body as to_body().
+TEMPLATE_ID = 'ai_resources_search'
+
+# Filter clauses in to_body() order, with the param that switches each on.
+# tags is a list, and a mustache section over a list repeats per item, so
+# it is switched by has_tags.
+TEMPLATE_FILTERS = (('status', 'status'),) + tuple(
+    (facet, 'has_tags' if facet == 'tags' else facet) for facet in FACETS
+)
+
+
+def _comma_after_any(flags):
+    """A comma when any of flags is set, from nested mustache sections"""
+    if not flags:
+        return ''
+    flag = flags[0]
+    if len(flags) == 1:
+        return f'{{{{#{flag}}}}},{{{{/{flag}}}}}'
+    return f'{{{{#{flag}}}}},{{{{/{flag}}}}}{{{{^{flag}}}}}{_comma_after_any(flags[1:])}{{{{/{flag}}}}}'
+
+
+def _template_source():
+    filters = []
+    for i, (param, flag) in enumerate(TEMPLATE_FILTERS):
+        clause = 'terms' if param == 'tags' else 'term'
+        earlier = [earlier_flag for _, earlier_flag in TEMPLATE_FILTERS[:i]]
+        filters.append(
+            f'{{{{#{flag}}}}}{_comma_after_any(earlier)}'
+            f'{{"{clause}":{{"{FILTER_FIELDS[param]}": {{{{#toJson}}}}{param}{{{{/toJson}}}}}}}}'
+            f'{{{{/{flag}}}}}'
+        )
+    return (
+        '{"query":{"bool":{'
+        '"must":[{{#text}}{"multi_match":{"query": {{#toJson}}text{{/toJson}},'
+        f'"fields":{json.dumps(SEARCH_FIELDS)},"type":"best_fields"'
+        '{{#fuzzy}},"fuzziness":"AUTO"{{/fuzzy}}}}{{/text}}],'
+        '"filter":[' + ''.join(filters) + ']}},'
+        '"sort":[{{#score_sort}}{"_score":{"order":"desc"}},{"created_at":{"order":"desc"}}{{/score_sort}}'
+        '{{^score_sort}}{ {{#toJson}}sort_by{{/toJson}}:{"order": {{#toJson}}sort_order{{/toJson}}}}{{/score_sort}}],'
+        '"from":{{from}},'
+        '"size":{{size}},'
+        '"track_total_hits":{{track_total_hits}}}'
+    )
+
+
+TEMPLATE_SOURCE = _template_source()
+
+
+class SearchQuery:
+    """Compiles resource search parameters into a single Elasticsearch query shape"""
+
+    templates_registered = False
+
+    def __init__(self, text=None, category=None, resource_type=None, tags=None,
+                 status='approved', sort_by=None, sort_order='desc', page=1, size=10,
+                 cursor=None, match='adaptive', min_hits=FUZZY_MIN_HITS,
+                 difficulty_level=None, include_facets=False, total_policy=None,
+                 fields=None, highlight=False, preference=None):
+        self.text = text or None
+        self.category = category if category and category != 'all' else None
+        self.resource_type = resource_type if resource_type and resource_type != 'all' else None
+        if isinstance(tags, str):
+            tags = [tag.strip() for tag in tags.split(',') if tag.strip()]
+        self.tags = sorted(set(tags)) if tags else None
+        self.difficulty_level = difficulty_level if difficulty_level and difficulty_level != 'all' else None
+        self.include_facets = include_facets
+        self.total_policy = total_policy or TOTAL_HITS_POLICY
+        self.total_value = None
+        self.total_relation = None
+        self.source = source_filter(fields)
+        self.highlight = bool(highlight and self.text)
+        self.preference = preference
+        self.status = status
+        self.sort_by = sort_by or None
+        self.sort_order = sort_order
+        self.page = int(page)
+        self.size = int(size)
+
+        self.match = match
+        self.min_hits = int(min_hits)
+        self.fuzzy = match == 'fuzzy'
+        self.suggest = False
+        self.phase = None
+
+        if self.total_policy not in TOTAL_POLICIES:
+            raise ValueError(f"track_total must be one of: {', '.join(TOTAL_POLICIES)}")
+        if self.match not in MATCH_MODES:
+            raise ValueError(f"match must be one of: {', '.join(MATCH_MODES)}")
+        if self.sort_order not in SORT_ORDERS:
+            raise ValueError(f"sort_order must be one of: {', '.join(SORT_ORDERS)}")
+        if self.page < 1 or self.size < 1:
+            raise ValueError("page and size must be positive integers")
+
+        # cursor=None pages with from/size, the default; '' starts a new cursor
+        self.cursor_mode = cursor is not None
+        self.pit_id = None
+        self.search_after = None
+        if cursor:
+            self.pit_id, self.search_after, phase = decode_cursor(cursor)
+            if phase:
+                # Later pages stay in the phase that answered the first one
+                self.match = phase
+                self.fuzzy = phase == 'fuzzy'
+        if not self.cursor_mode and self.page * self.size > MAX_RESULT_WINDOW:
+            raise ValueError(f"page and size exceed {MAX_RESULT_WINDOW} results, use cursor pagination instead")
+
+    @classmethod
+    def from_args(cls, args, default_size=10, status='approved', preference=None):
+        """Build a query from request arguments"""
+        return cls(
+            text=args.get('query'),
+            category=args.get('category'),
+            resource_type=args.get('resource_type') or args.get('type'),
+            tags=args.get('tags'),
+            difficulty_level=args.get('difficulty_level'),
+            status=status,
+            sort_by=args.get('sort_by'),
+            sort_order=args.get('sort_order', 'desc'),
+            page=args.get('page', 1),
+            size=args.get('size', default_size),
+            cursor=args.get('cursor'),
+            match=args.get('match', 'adaptive'),
+            min_hits=args.get('min_hits', FUZZY_MIN_HITS),
+            include_facets=str(args.get('include_facets', '')).lower() in ('1', 'true', 'yes'),
+            total_policy=args.get('track_total'),
+            fields=args.get('fields'),
+            highlight=str(args.get('highlight', '')).lower() in ('1', 'true', 'yes'),
+            preference=preference
+        )
+
+    def must_clauses(self):
+        """Scored clauses"""
+        if not self.text:
+            return []
+        multi_match = {
+            'query': self.text,
+            'fields': SEARCH_FIELDS,
+            'type': 'best_fields'
+        }
+        if self.fuzzy:
+            multi_match['fuzziness'] = 'AUTO'
+        return [{'multi_match': multi_match}]
+
+    def filter_clauses(self):
+        """Non-scoring exact-match clauses"""
+        return self.base_filters() + self.facet_filters()
+
+    def base_filters(self):
+        """Filters that also scope the facet counts"""
+        if not self.status:
+            return []
+        return [{'term': {FILTER_FIELDS['status']: self.status}}]
+
+    def facet_filters(self, exclude=None):
+        """Filters on faceted fields, optionally leaving one facet out"""
+        filters = []
+        for facet in FACETS:
+            value = getattr(self, facet)
+            if facet == exclude or not value:
+                continue
+            if isinstance(value, list):
+                filters.append({'terms': {FILTER_FIELDS[facet]: value}})
+            else:
+                filters.append({'term': {FILTER_FIELDS[facet]: value}})
+        return filters
+
+    def facet_aggs(self):
+        """Per-facet terms aggregations, each filtered by every other active facet"""
+        aggs = {}
+        for facet in FACETS:
+            aggs[facet] = {
+                'filter': {'bool': {'filter': self.facet_filters(exclude=facet)}},
+                'aggs': {
+                    'values': {'terms': {'field': FILTER_FIELDS[facet], 'size': FACET_SIZE}}
+                }
+            }
+        return aggs
+
+    def sort_clauses(self):
+        """Relevance first when there is a text query, newest first otherwise"""
+        sort_by = self.sort_field()
+        if sort_by == '_score':
+            return [{'_score': {'order': 'desc'}}, {'created_at': {'order': 'desc'}}]
+        return [{sort_by: {'order': self.sort_order}}]
+
+    def sort_field(self):
+        return self.sort_by or ('_score' if self.text else 'created_at')
+
+    def params(self):
+        """Scalar parameters for the stored search template; unset filters are left out"""
+        sort_by = self.sort_field()
+        params = {
+            'text': self.text,
+            'fuzzy': self.fuzzy,
+            'status': self.status,
+            'category': self.category,
+            'resource_type': self.resource_type,
+            'tags': self.tags,
+            'has_tags': bool(self.tags),
+            'difficulty_level': self.difficulty_level,
+            'score_sort': sort_by == '_score',
+            'sort_by': sort_by,
+            'sort_order': self.sort_order,
+            'from': (self.page - 1) * self.size,
+            'size': self.size,
+            'track_total_hits': self.track_total_hits()
+        }
+        return {name: value for name, value in params.items() if value is not None}
+
+    def to_body(self):
+        """Render the full search body, identical to what the stored template produces"""
+        return {
+            'query': {
+                'bool': {
+                    'must': self.must_clauses(),
+                    'filter': self.filter_clauses()
+                }
+            },
+            'sort': self.sort_clauses(),
+            'from': (self.page - 1) * self.size,
+            'size': self.size,
+            'track_total_hits': self.track_total_hits()
+        }
+
+    def track_total_hits(self):
+        """track_total_hits value for the current total policy"""
+        if self.total_policy == 'exact':
+            return True
+        if self.total_policy == 'cached' and count_cache.peek(self.count_key()) is not None:
+            return False
+        return TOTAL_HITS_CAP
+
+    def count_key(self):
+        """Key for the cached count of this query's matches, independent of paging"""
+        return json.dumps({'must': self.must_clauses(), 'filter': self.filter_clauses()}, sort_keys=True)
+
+    def hits_total(self, result):
+        """(value, relation) for result, using the count cache when the search did not count"""
+        total = result['hits'].get('total')
+        if total is not None:
+            return total['value'], total['relation']
+        cached = count_cache.peek(self.count_key())
+        if cached is not None:
+            return cached, 'eq'
+        return len(result['hits']['hits']), 'gte'
+
+    def resolve_total(self, es, index, result):
+        """Set total_value and total_relation, scheduling a background count if the policy asks for one"""
+        if self.total_policy == 'cached':
+            body = {'query': {'bool': {'must': self.must_clauses(), 'filter': self.filter_clauses()}}}
+            params = self.search_params()
+            count_cache.get(self.count_key(), lambda: es.count(index=index, body=body, **params)['count'])
+        self.total_value, self.total_relation = self.hits_total(result)
+
+    def full_body(self):
+        """Search body including the parts the stored template does not cover"""
+        body = self.to_body()
+        if self.include_facets:
+            # Facet filters move to post_filter so the aggregations see
+            # the hits before them and can apply all-but-their-own filter
+            body['query']['bool']['filter'] = self.base_filters()
+            body['post_filter'] = {'bool': {'filter': self.facet_filters()}}
+            body['aggs'] = self.facet_aggs()
+        if self.suggest:
+            body['suggest'] = self.suggest_body()
+        if self.source is not None:
+            body['_source'] = self.source
+        if self.highlight:
+            body['_source'] = exclude_source_field(body.get('_source'), 'description')
+            body['highlight'] = self.highlight_body()
+        return body
+
+    def highlight_body(self):
+        """Bounded description fragments; no_match_size keeps a leading fragment when only other fields matched"""
+        return {
+            'fields': {
+                'description': {
+                    'fragment_size': HIGHLIGHT_FRAGMENT_SIZE,
+                    'number_of_fragments': HIGHLIGHT_FRAGMENTS,
+                    'no_match_size': HIGHLIGHT_FRAGMENT_SIZE
+                }
+            }
+        }
+
+    def routing(self):
+        """Shard routing for a single-type search; facet counts span every type, so they fan out"""
+        if self.include_facets:
+            return None
+        return search_routing(self.resource_type)
+
+    def search_params(self):
+        """routing and preference for the search request, when set"""
+        params = routed_params(self.routing())
+        if self.preference:
+            params['preference'] = self.preference
+        return params
+
+    def uses_template(self):
+        """Whether the stored template covers this body"""
+        return (self.templates_registered and not self.suggest and not self.include_facets
+                and self.source is None and not self.highlight)
+
+    def suggest_body(self):
+        """Term suggester for the "did you mean" list"""
+        return {
+            'text': self.text,
+            'did_you_mean': {
+                'term': {'field': 'title', 'suggest_mode': 'popular'}
+            }
+        }
+
+    def cursor_body(self):
+        """Search body for a point-in-time page continuing after the last sort values"""
+        body = self.full_body()
+        body.pop('from')
+        body['pit'] = {'id': self.pit_id, 'keep_alive': PIT_KEEP_ALIVE}
+        if self.search_after:
+            body['search_after'] = self.search_after
+        return body
+
+    def cache_key(self, index):
+        """Normalized key for identical searches"""
+        return json.dumps({
+            'index': index,
+            'params': self.params(),
+            'match': self.match,
+            'min_hits': self.min_hits,
+            'include_facets': self.include_facets,
+            'total_policy': self.total_policy,
+            'source': self.source,
+            'highlight': self.highlight
+        }, sort_keys=True)
+
+    def execute(self, es, index):
+        """Run the query and resolve its total"""
+        result = self.execute_cached(es, index)
+        self.resolve_total(es, index, result)
+        return result
+
+    def execute_cached(self, es, index):
+        """Run the query through the result cache; cursor pages are never cached"""
+        if self.cursor_mode:
+            return self.execute_uncached(es, index)
+
+        key = self.cache_key(index)
+        cached = search_cache.get(key)
+        if cached is not None:
+            result, self.phase = cached
+            return result
+
+        # Identical concurrent misses share one round trip
+        generation = search_cache.generation
+        result, self.phase = search_flight.do(
+            key, lambda: (self.execute_uncached(es, index), self.phase)
+        )
+        search_cache.set(key, (result, self.phase), generation)
+        return result
+
+    def execute_uncached(self, es, index):
+        """Run the query, falling back to fuzzy matching when exact recall is low"""
+        self.begin()
+        result = self.run(es, index)
+        if self.needs_fallback(result):
+            result = self.run(es, index)
+        return result
+
+    def begin(self):
+        """Set up the first search phase"""
+        if self.match == 'adaptive' and self.text:
+            self.fuzzy = False
+            self.phase = 'exact'
+        else:
+            self.phase = 'fuzzy' if self.fuzzy and self.text else ('exact' if self.text else None)
+
+    def needs_fallback(self, result):
+        """Switch to the fuzzy phase when the exact phase found too few hits"""
+        if self.match != 'adaptive' or not self.text or self.fuzzy:
+            return False
+        if self.hits_total(result)[0] >= self.min_hits:
+            return False
+        self.fuzzy = True
+        self.suggest = True
+        self.phase = 'fuzzy'
+        return True
+
+    def run(self, es, index):
+        """Run a single phase, sending only params when the stored template is available"""
+        if self.cursor_mode:
+            return self.execute_cursor(es, index)
+        if self.uses_template():
+            return es.search_template(
+                index=index,
+                body={'id': TEMPLATE_ID, 'params': self.params()},
+                **self.search_params()
+            )
+        return es.search(index=index, body=self.full_body(), **self.search_params())
+
+    def execute_cursor(self, es, index):
+        """Run one page against a point-in-time; the PIT adds the _shard_doc tiebreaker"""
+        if not self.pit_id:
+            # A routed point-in-time only holds the type's shard open
+            self.pit_id = es.open_point_in_time(
+                index=index, keep_alive=PIT_KEEP_ALIVE, **self.search_params()
+            )['id']
+        try:
+            result = es.search(body=self.cursor_body())
+        except NotFoundError:
+            raise ValueError("Cursor has expired, start again with an empty cursor")
+        self.pit_id = result.get('pit_id', self.pit_id)
+        return result
+
+    def next_cursor(self, es, result):
+        """Opaque cursor for the page after result, or None once results run out"""
+        if not self.cursor_mode:
+            return None
+        hits = result['hits']['hits']
+        if len(hits) < self.size:
+            try:
+                es.close_point_in_time(body={'id': self.pit_id})
+            except Exception:
+                pass
+            return None
+        return encode_cursor(self.pit_id, hits[-1]['sort'], self.phase)
+
+    def suggestions(self, result):
+        """Corrected query strings from the term suggester, best first"""
+        entries = result.get('suggest', {}).get('did_you_mean', [])
+        corrected = []
+        for rank in range(MAX_SUGGESTIONS):
+            words = []
+            changed = False
+            for entry in entries:
+                options = entry['options']
+                if len(options) > rank:
+                    words.append(options[rank]['text'])
+                    changed = True
+                elif options:
+                    words.append(options[0]['text'])
+                else:
+                    words.append(entry['text'])
+            phrase = ' '.join(words)
+            if changed and phrase not in corrected:
+                corrected.append(phrase)
+        return corrected
+
+    def facets(self, result):
+        """Facet counts as {facet: [{'value', 'count'}]}"""
+        aggregations = result.get('aggregations', {})
+        return {
+            facet: [
+                {'value': bucket['key'], 'count': bucket['doc_count']}
+                for bucket in aggregations[facet]['values']['buckets']
+            ]
+            for facet in FACETS if facet in aggregations
+        }
+
+    def response_meta(self, es, result):
+        """Pagination, search-phase and facet metadata shared by the listing responses"""
+        meta = {
+            'next_cursor': self.next_cursor(es, result),
+            'search_phase': self.phase,
+            'suggestions': self.suggestions(result)
+        }
+        if self.include_facets:
+            meta['facets'] = self.facets(result)
+        return meta
+
+    @classmethod
+    def register_templates(cls, es):
+        """Store the search template in the cluster unless it is already current
+
+        put_script is a cluster state update, so a start with an unchanged
+        template only reads it.
+        """
+        try:
+            try:
+                stored = es.get_script(id=TEMPLATE_ID).get('script', {}).get('source')
+            except NotFoundError:
+                stored = None
+            if stored != TEMPLATE_SOURCE:
+                es.put_script(
+                    id=TEMPLATE_ID,
+                    body={'script': {'lang': 'mustache', 'source': TEMPLATE_SOURCE}}
+                )
+            cls.templates_registered = True
+        except Exception as e:
+            print(f"Could not register search templates, falling back to inline queries: {str(e)}")
+            cls.templates_registered = False
+        return cls.templates_registered
+
+
+def execute_batch(es, index, queries):
+    """Run page-mode SearchQuery objects through _msearch
+
+    Cached queries are answered locally and the rest share one _msearch;
+    adaptive queries that need the fuzzy fallback share a second one.
+    Returns results or exceptions in input order.
+    """
+    results = [None] * len(queries)
+    pending = []
+    for i, search_query in enumerate(queries):
+        cached = search_cache.get(search_query.cache_key(index))
+        if cached is not None:
+            results[i], search_query.phase = cached
+            search_query.resolve_total(es, index, results[i])
+        else:
+            search_query.begin()
+            pending.append(i)
+
+    generation = search_cache.generation
+    while pending:
+        responses = _msearch(es, index, [queries[i] for i in pending])
+        fallback = []
+        for i, response in zip(pending, responses):
+            search_query = queries[i]
+            if 'error' in response:
+                results[i] = RuntimeError(str(response['error'].get('reason', response['error'])))
+            elif search_query.needs_fallback(response):
+                fallback.append(i)
+            else:
+                results[i] = response
+                search_cache.set(search_query.cache_key(index), (response, search_query.phase), generation)
+                search_query.resolve_total(es, index, response)
+        pending = fallback
+    return results
+
+
+def _msearch(es, index, queries):
+    """One _msearch round trip for the given queries"""
+    lines = []
+    for search_query in queries:
+        lines.append({'index': index, **search_query.search_params()})
+        lines.append(search_query.full_body())
+    return es.msearch(body=lines)['responses']
+
+
+def listing_response(search_query, es, result):
+    """Response body shared by the resource listing endpoints"""
+    total_hits = search_query.total_value
+    return {
+        'resources': hits_to_resources(result),
+        'total': total_hits,
+        'total_relation': search_query.total_relation,
+        'page': search_query.page,
+        'size': search_query.size,
+        'total_pages': (total_hits + search_query.size - 1) // search_query.size,
+        **search_query.response_meta(es, result)
+    }
+
+
+def encode_cursor(pit_id, search_after, phase=None):
+    """Pack a point-in-time id, sort values and search phase into an opaque cursor"""
+    payload = json.dumps({'pit': pit_id, 'after': search_after, 'phase': phase}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Unpack a cursor made by encode_cursor"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return payload['pit'], payload['after'], payload.get('phase')
+    except (binascii.Error, ValueError, KeyError, TypeError, UnicodeError):
+        raise ValueError("Invalid cursor")
+
+
+def source_filter(fields):
+    """_source filter for a fields= value: comma separated names or presets, '-name' excludes"""
+    if not fields or fields == 'all':
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    includes = []
+    excludes = []
+    for field in (field.strip() for field in fields):
+        if not field:
+            continue
+        if field.startswith('-'):
+            excludes.append(field[1:])
+        else:
+            includes.extend(FIELD_PRESETS.get(field, [field]))
+    source = {}
+    if includes:
+        source['includes'] = sorted(set(includes))
+    if excludes:
+        source['excludes'] = sorted(set(excludes))
+    return source or None
+
+
+def exclude_source_field(source, field):
+    """Add field to the excludes of a _source filter; False when nothing else was included"""
+    source = dict(source or {})
+    if field in source.get('includes', []):
+        source['includes'] = [name for name in source['includes'] if name != field]
+        # Empty includes would return the whole document
+        if not source['includes']:
+            return False
+    source['excludes'] = sorted(set(source.get('excludes', []) + [field]))
+    return source
+
+
+def hits_to_resources(result):
+    """Flatten search hits into resource dicts, using highlighted fragments when present"""
+    # Copy rather than mutate, the result may be shared through the cache
+    resources = []
+    for hit in result['hits']['hits']:
+        resource_data = {**hit.get('_source', {}), 'id': hit['_id']}
+        resource_data.pop('suggest', None)
+        fragments = hit.get('highlight', {}).get('description')
+        if fragments:
+            resource_data['description'] = ' ... '.join(fragments)
+        resources.append(resource_data)
+    return resources
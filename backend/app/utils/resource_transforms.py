@@ -0,0 +1,129 @@
+import re
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+from app.models.resource import Resource
+from app.utils.backfill import transform
+
+DATE_FIELDS = ('publication_date', 'created_at', 'updated_at')
+
+# ISO 8601 as Elasticsearch's default date format reads it. The models and
+# routes write datetime.isoformat() values, which already match
+ISO_DATE = re.compile(r'\d{4}-\d{2}-\d{2}(T\d{2}:\d{2}(:\d{2}(\.\d{1,9})?)?(Z|[+-]\d{2}:?\d{2})?)?')
+
+# Formats seen in scraped and hand-entered data, besides ISO 8601
+DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d', '%d/%m/%Y', '%b %d, %Y', '%B %d, %Y', '%d %b %Y', '%d %B %Y')
+
+# Where the URL says more about the type than the document does
+HOST_TYPES = {
+    'github.com': 'GitHub Repository',
+    'arxiv.org': 'Research Paper',
+    'youtube.com': 'Video',
+    'youtu.be': 'Video',
+    'coursera.org': 'Course',
+    'udemy.com': 'Course',
+    'edx.org': 'Course',
+    'medium.com': 'Blog Post',
+    'towardsdatascience.com': 'Blog Post'
+}
+
+_TYPES_BY_NAME = {resource_type.lower(): resource_type for resource_type in Resource.RESOURCE_TYPES}
+
+
+def parse_star_count(value):
+    """GitHub's star display strings ('1,234', '12.5k', '3m') as an integer, None if unreadable"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if not isinstance(value, str):
+        return None
+    match = re.fullmatch(r'([\d.,]+)\s*([km]?)', value.strip().lower().replace(' stars', '').strip())
+    if not match:
+        return None
+    number, suffix = match.groups()
+    try:
+        if suffix:
+            return int(float(number.replace(',', '')) * (1000 if suffix == 'k' else 1000000))
+        return int(number.replace(',', '').replace('.', ''))
+    except ValueError:
+        return None
+
+
+def normalize_date(value):
+    """A date in any known format as ISO 8601 UTC ('2024-01-15T10:00:00Z'), None if unreadable
+
+    Strings that are already ISO 8601 are returned unchanged. Epoch numbers
+    are read as milliseconds when large enough, seconds otherwise. Dates
+    without an offset are taken as UTC.
+    """
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, str) and ISO_DATE.fullmatch(value):
+        return value
+    if isinstance(value, (int, float)):
+        seconds = value / 1000 if value > 1e11 else value
+        parsed = datetime.fromtimestamp(seconds, tz=timezone.utc)
+    elif isinstance(value, str):
+        text = value.strip()
+        parsed = None
+        try:
+            parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+        except ValueError:
+            for date_format in DATE_FORMATS:
+                try:
+                    parsed = datetime.strptime(text, date_format)
+                    break
+                except ValueError:
+                    continue
+        if parsed is None:
+            return None
+    else:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    if parsed.microsecond:
+        # Elasticsearch dates keep milliseconds
+        return parsed.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+    return parsed.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def infer_resource_type(source):
+    """Resource type from the category or the URL host, None when neither says"""
+    category = source.get('category')
+    if isinstance(category, str) and category.strip().lower() in _TYPES_BY_NAME:
+        return _TYPES_BY_NAME[category.strip().lower()]
+    host = (urlsplit(source.get('url') or '').hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    return HOST_TYPES.get(host)
+
+
+@transform('normalize_resource_fields', version=1, index=Resource.index_name)
+def normalize_resource_fields(source):
+    """stars -> github_stars, fill or fix resource_type and category, ISO 8601 UTC dates"""
+    if 'stars' in source:
+        stars = parse_star_count(source.pop('stars'))
+        if source.get('github_stars') is None and stars is not None:
+            source['github_stars'] = stars
+    elif isinstance(source.get('github_stars'), str):
+        source['github_stars'] = parse_star_count(source['github_stars'])
+
+    resource_type = source.get('resource_type')
+    if isinstance(resource_type, str) and resource_type.strip().lower() in _TYPES_BY_NAME:
+        source['resource_type'] = _TYPES_BY_NAME[resource_type.strip().lower()]
+    elif not resource_type:
+        inferred = infer_resource_type(source)
+        if inferred:
+            source['resource_type'] = inferred
+
+    # Lowercase categories from the old sample data match a type name
+    category = source.get('category')
+    if isinstance(category, str) and category.strip().lower() in _TYPES_BY_NAME:
+        source['category'] = _TYPES_BY_NAME[category.strip().lower()]
+
+    for field in DATE_FIELDS:
+        if source.get(field) is not None:
+            normalized = normalize_date(source[field])
+            if normalized:
+                source[field] = normalized
+    return source
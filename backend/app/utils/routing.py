@@ -0,0 +1,63 @@
+import hashlib
+import os
+import re
+import uuid
+
+# With RESOURCE_ROUTING=resource_type every resource is stored on the shard
+# picked by its type, so searches filtered on one type touch one shard.
+# Routed resources get ids of the form '<type slug>~<uuid>', which lets
+# gets, updates and deletes recover the routing from the id alone. Ids
+# without the separator were indexed without routing and keep working.
+# Only enable it once scripts/migrate_index.py --route-by-type has moved
+# the existing resources onto routed ids.
+ROUTE_BY_TYPE = os.getenv('RESOURCE_ROUTING', 'none') == 'resource_type'
+ROUTING_SEPARATOR = '~'
+
+
+def type_routing(resource_type):
+    """Routing key for a resource type, e.g. 'GitHub Repository' -> 'github-repository'"""
+    return re.sub(r'[^a-z0-9]+', '-', resource_type.lower()).strip('-')
+
+
+def new_resource_id(resource_type):
+    """Id for a routed resource, carrying its routing key"""
+    return f"{type_routing(resource_type)}{ROUTING_SEPARATOR}{uuid.uuid4().hex}"
+
+
+def routing_for_id(resource_id):
+    """Routing key encoded in a resource id, or None for unrouted ids"""
+    if ROUTING_SEPARATOR not in resource_id:
+        return None
+    return resource_id.split(ROUTING_SEPARATOR, 1)[0]
+
+
+def search_routing(resource_type):
+    """Routing for a search filtered on resource_type, None to fan out to every shard"""
+    if not ROUTE_BY_TYPE or not resource_type:
+        return None
+    return type_routing(resource_type)
+
+
+def routed_params(routing):
+    """Keyword arguments adding routing to a client call when there is one"""
+    return {'routing': routing} if routing else {}
+
+
+def resource_refs(resource_ids):
+    """_mget docs for resource ids, each carrying its routing"""
+    return [{'_id': resource_id, **routed_params(routing_for_id(resource_id))} for resource_id in resource_ids]
+
+
+def session_preference(request):
+    """Search preference that keeps one session on the same shard copies
+
+    Repeated searches from a session then hit warm caches and see a stable
+    ordering. Clients may send X-Search-Session; otherwise the bearer token
+    identifies the session, falling back to the client address. Hashed so
+    the token never reaches Elasticsearch, and never starting with '_',
+    which is reserved for the built-in preferences.
+    """
+    session = (request.headers.get('X-Search-Session')
+               or request.headers.get('Authorization')
+               or f"{request.remote_addr}|{request.headers.get('User-Agent', '')}")
+    return 's' + hashlib.sha1(session.encode('utf-8')).hexdigest()[:16]
@@ -0,0 +1,125 @@
+import hashlib
+import json
+from datetime import datetime
+from urllib.parse import urlsplit, urlunsplit
+from elasticsearch.exceptions import NotFoundError
+from elasticsearch.helpers import streaming_bulk
+from app.models.resource import Resource, ResourceValidationError
+from app.models.user import User
+from app.utils.cache import invalidate_resource_caches
+from app.utils.es_client import get_es
+
+# One marker document per seed set records the version last loaded, so a
+# start with nothing new to seed is a single realtime get and no writes
+SEED_INDEX = 'ai_seed_markers'
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url):
+    """Canonical form of a resource URL: lowercase scheme and host, no default port, fragment or trailing slash"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip('/')
+    return urlunsplit((scheme, host, path, parts.query, ''))
+
+
+def resource_id_for_url(url):
+    """Deterministic resource id, the same for every spelling of one URL"""
+    return hashlib.sha1(normalize_url(url).encode('utf-8')).hexdigest()
+
+
+def seed_version(documents):
+    """Content hash of a seed set; editing the seed data changes it"""
+    payload = json.dumps(documents, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def seeded_version(es, name):
+    """Version recorded by the marker for seed set name, or None"""
+    try:
+        return es.get(index=SEED_INDEX, id=name)['_source'].get('version')
+    except NotFoundError:
+        return None
+
+
+def mark_seeded(es, name, version, count):
+    es.index(index=SEED_INDEX, id=name, body={
+        'name': name,
+        'version': version,
+        'count': count,
+        'seeded_at': datetime.utcnow().isoformat()
+    })
+
+
+def seed_resources(name, resources, force=False):
+    """Load resources once per version of the seed set
+
+    Ids come from the normalized URL and every action is op_type=create,
+    so rerunning never duplicates or overwrites a resource. created_at in
+    the seed data is kept. Returns {'skipped', 'created', 'existing',
+    'failed'}; skipped is True when the marker already had this version.
+    """
+    es = get_es()
+    version = seed_version(resources)
+    summary = {'skipped': False, 'created': 0, 'existing': 0, 'failed': []}
+    if not force and seeded_version(es, name) == version:
+        summary['skipped'] = True
+        return summary
+
+    Resource.setup_index()
+
+    def actions():
+        for resource_data in resources:
+            resource_data = dict(resource_data)
+            created_at = resource_data.pop('created_at', None)
+            try:
+                resource, body = Resource.build(resource_data)
+            except ResourceValidationError as e:
+                summary['failed'].append({'id': resource_data.get('url'), 'error': str(e)})
+                continue
+            if created_at:
+                body['created_at'] = body['updated_at'] = created_at
+            yield {
+                '_op_type': 'create',
+                **Resource.placement(resource.resource_type, resource_id_for_url(resource.url)),
+                '_source': body
+            }
+
+    for ok, item in streaming_bulk(es, actions(), raise_on_error=False, raise_on_exception=False):
+        info = item['create']
+        if ok:
+            summary['created'] += 1
+        elif info.get('status') == 409:
+            summary['existing'] += 1
+        else:
+            summary['failed'].append({'id': info.get('_id'), 'error': str(info.get('error', info))})
+
+    if summary['created']:
+        es.indices.refresh(index=Resource.index_name)
+        invalidate_resource_caches()
+    if not summary['failed']:
+        mark_seeded(es, name, version, summary['created'] + summary['existing'])
+    return summary
+
+
+def seed_user(user_data):
+    """Create a user unless one with that email already exists; returns True when created"""
+    if User.get_by_email(user_data['email']):
+        return False
+    User.create(user_data)
+    return True
+
+
+def print_seed_summary(name, summary):
+    if summary['skipped']:
+        print(f"✓ Seed data '{name}' is current, nothing to load")
+        return
+    print(f"✓ Seed data '{name}': {summary['created']} created, {summary['existing']} already present")
+    for failed in summary['failed']:
+        print(f"  ✗ {failed['id']}: {failed['error']}")
@@ -0,0 +1,81 @@
+import json
+import os
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one in-flight call"""
+
+    def __init__(self, timeout=5.0):
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+        self.timeouts = 0
+
+    def do(self, key, fn, timeout=None):
+        """Run fn once per key; concurrent callers wait for and share its result
+
+        A follower that waits longer than timeout runs fn itself, so a slow
+        leader cannot stall everyone behind it.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            if call.done.wait(self.timeout if timeout is None else timeout):
+                with self._lock:
+                    self.shared += 1
+                if call.error is not None:
+                    raise call.error
+                return call.result
+            with self._lock:
+                self.timeouts += 1
+            return fn()
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        """Counters for monitoring"""
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'leaders': self.leaders,
+                'shared': self.shared,
+                'timeouts': self.timeouts
+            }
+
+
+# Shared across Flask worker threads for Elasticsearch searches
+search_flight = SingleFlight(timeout=float(os.getenv('SEARCH_SINGLEFLIGHT_TIMEOUT', 5)))
+
+
+def coalesced_search(es, index, body):
+    """es.search, sharing one in-flight request between identical concurrent bodies"""
+    key = json.dumps({'index': index, 'body': body}, sort_keys=True)
+    return search_flight.do(key, lambda: es.search(index=index, body=body))
@@ -0,0 +1,236 @@
+import gzip
+import json
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from elasticsearch.exceptions import NotFoundError
+from elasticsearch.helpers import parallel_bulk
+
+# Export keeps its point-in-time open this long between pages, and for a
+# resumed export to pick up where a crashed one stopped
+EXPORT_KEEP_ALIVE = '10m'
+PROGRESS_EVERY = 10000
+
+
+class TransferError(Exception):
+    pass
+
+
+class Progress:
+    """Docs and bytes moved, reported as docs/s and MB/s"""
+
+    def __init__(self, label, docs=0, nbytes=0):
+        self.label = label
+        self.docs = docs
+        self.bytes = nbytes
+        self._start_docs = docs
+        self._start_bytes = nbytes
+        self._start = time.perf_counter()
+        self._reported = docs
+
+    def add(self, docs, nbytes):
+        self.docs += docs
+        self.bytes += nbytes
+        if self.docs - self._reported >= PROGRESS_EVERY:
+            self._reported = self.docs
+            self.report()
+
+    def report(self, final=False):
+        elapsed = max(time.perf_counter() - self._start, 1e-9)
+        docs_per_second = (self.docs - self._start_docs) / elapsed
+        mb_per_second = (self.bytes - self._start_bytes) / elapsed / 1024 / 1024
+        prefix = '✓' if final else '…'
+        print(f"{prefix} {self.label}: {self.docs} docs, {self.bytes / 1024 / 1024:.1f} MB "
+              f"in {elapsed:.1f}s ({docs_per_second:.0f} docs/s, {mb_per_second:.2f} MB/s)")
+
+
+def checkpoint_path(path):
+    return f"{path}.checkpoint"
+
+
+def read_checkpoint(path):
+    try:
+        with open(checkpoint_path(path)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_checkpoint(path, state):
+    """Replace the checkpoint atomically so a crash never leaves half of one"""
+    tmp = f"{checkpoint_path(path)}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, checkpoint_path(path))
+
+
+def clear_checkpoint(path):
+    try:
+        os.remove(checkpoint_path(path))
+    except FileNotFoundError:
+        pass
+
+
+def export_index(es, index, path, page_size=1000, resume=False, checkpoint_every=10):
+    """Stream index to NDJSON at path, gzipped when it ends in .gz
+
+    Pages through a point-in-time with search_after, so memory stays
+    constant and the export is a consistent snapshot. Each line is
+    {"_id", "_routing"?, "_source"}. Every checkpoint_every pages the file
+    offset, PIT and sort values are checkpointed; resume=True truncates the
+    file to the last checkpoint and continues from there while the PIT is
+    still open. Each checkpointed stretch of a .gz file is its own gzip
+    member, so truncating at a checkpoint leaves a valid file.
+    """
+    state = read_checkpoint(path) if resume else None
+    if state is None:
+        pit_id = es.open_point_in_time(index=index, keep_alive=EXPORT_KEEP_ALIVE)['id']
+        state = {'index': index, 'pit': pit_id, 'after': None, 'offset': 0, 'docs': 0, 'bytes': 0}
+    elif state.get('index') != index:
+        raise TransferError(f"Checkpoint is for {state.get('index')}, not {index}")
+
+    progress = Progress(f"export {index}", state['docs'], state['bytes'])
+    compress = path.endswith('.gz')
+    raw = open(path, 'r+b' if state['offset'] else 'wb')
+    try:
+        raw.truncate(state['offset'])
+        raw.seek(state['offset'])
+        out = gzip.GzipFile(fileobj=raw, mode='wb') if compress else raw
+        pages = 0
+        while True:
+            body = {
+                'size': page_size,
+                'sort': [{'_shard_doc': 'asc'}],
+                'pit': {'id': state['pit'], 'keep_alive': EXPORT_KEEP_ALIVE}
+            }
+            if state['after']:
+                body['search_after'] = state['after']
+            try:
+                result = es.search(body=body)
+            except NotFoundError:
+                raise TransferError("Point-in-time expired, rerun the export without --resume")
+            state['pit'] = result.get('pit_id', state['pit'])
+            hits = result['hits']['hits']
+            if not hits:
+                break
+
+            lines = []
+            for hit in hits:
+                line = {'_id': hit['_id'], '_source': hit['_source']}
+                if hit.get('_routing'):
+                    line['_routing'] = hit['_routing']
+                lines.append(json.dumps(line, separators=(',', ':')))
+            data = ('\n'.join(lines) + '\n').encode('utf-8')
+            out.write(data)
+            state['after'] = hits[-1]['sort']
+            progress.add(len(hits), len(data))
+            pages += 1
+
+            if pages % checkpoint_every == 0:
+                if compress:
+                    out.close()
+                raw.flush()
+                state.update(offset=raw.tell(), docs=progress.docs, bytes=progress.bytes)
+                write_checkpoint(path, state)
+                if compress:
+                    # The next member's header comes after the checkpointed offset
+                    out = gzip.GzipFile(fileobj=raw, mode='wb')
+        if compress:
+            out.close()
+    finally:
+        raw.close()
+
+    try:
+        es.close_point_in_time(body={'id': state['pit']})
+    except Exception:
+        pass
+    clear_checkpoint(path)
+    progress.report(final=True)
+    return {'docs': progress.docs, 'bytes': progress.bytes}
+
+
+@contextmanager
+def bulk_ingest_mode(es, index, saved=None):
+    """Turn off refreshes and replicas on index for a load, restoring them afterwards
+
+    saved holds the settings to restore, for a resumed load whose index is
+    still in ingest mode; otherwise they are read from the index. Yields
+    the saved settings so they can be checkpointed.
+    """
+    if saved is None:
+        current = next(iter(es.indices.get_settings(
+            index=index, name=['index.refresh_interval', 'index.number_of_replicas'],
+            include_defaults=True, flat_settings=True
+        ).values()))
+        merged = {**current.get('defaults', {}), **current.get('settings', {})}
+        saved = {
+            'refresh_interval': merged.get('index.refresh_interval', '1s'),
+            'number_of_replicas': merged.get('index.number_of_replicas', '1')
+        }
+    es.indices.put_settings(index=index, body={'index': {'refresh_interval': '-1', 'number_of_replicas': 0}})
+    try:
+        yield saved
+    finally:
+        es.indices.put_settings(index=index, body={'index': saved})
+        es.indices.refresh(index=index)
+
+
+def read_lines(path, skip=0):
+    """Non-empty NDJSON lines of path after the first skip"""
+    opener = gzip.open if path.endswith('.gz') else open
+    seen = 0
+    with opener(path, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            seen += 1
+            if seen > skip:
+                yield line
+
+
+def import_index(es, index, path, thread_count=4, chunk_size=500, resume=False, checkpoint_every=10000):
+    """Load an export into index through parallel_bulk in bulk-ingest mode
+
+    Documents keep their ids and routing, so a rerun overwrites rather than
+    duplicates. The number of acknowledged lines is checkpointed every
+    checkpoint_every docs together with the settings to restore; resume=True
+    skips the acknowledged lines. Returns {'docs', 'bytes', 'failed'}.
+    """
+    state = read_checkpoint(path) if resume else None
+    if state is not None and state.get('index') != index:
+        raise TransferError(f"Checkpoint is for {state.get('index')}, not {index}")
+    state = state or {'index': index, 'lines': 0, 'bytes': 0, 'settings': None}
+
+    progress = Progress(f"import {index}", state['lines'], state['bytes'])
+    # Sizes of lines handed to parallel_bulk and not yet acknowledged
+    sizes = deque()
+    failed = []
+
+    def actions():
+        for line in read_lines(path, skip=state['lines']):
+            doc = json.loads(line)
+            sizes.append(len(line))
+            action = {'_op_type': 'index', '_index': index, '_id': doc['_id'], '_source': doc['_source']}
+            if doc.get('_routing'):
+                action['routing'] = doc['_routing']
+            yield action
+
+    with bulk_ingest_mode(es, index, state['settings']) as saved:
+        state['settings'] = saved
+        write_checkpoint(path, state)
+        # parallel_bulk yields results in action order, so every line up to
+        # the current one has been acknowledged
+        for ok, item in parallel_bulk(es, actions(), thread_count=thread_count, chunk_size=chunk_size,
+                                      raise_on_error=False, raise_on_exception=False):
+            if not ok:
+                info = next(iter(item.values()))
+                failed.append({'id': info.get('_id'), 'error': str(info.get('error', info))})
+            progress.add(1, sizes.popleft())
+            if progress.docs % checkpoint_every == 0:
+                state.update(lines=progress.docs, bytes=progress.bytes)
+                write_checkpoint(path, state)
+
+    clear_checkpoint(path)
+    progress.report(final=True)
+    return {'docs': progress.docs, 'bytes': progress.bytes, 'failed': failed}
@@ -1,12 +1,17 @@
 from app import create_app
-from app.utils.es_setup import create_index, index_sample_data
 
-app = create_app()
+# Password pool workers are spawned and re-import this file as __mp_main__;
+# they only hash passwords and must not build the app or touch Elasticsearch
+if __name__ != '__mp_main__':
+    app = create_app()
 
 if __name__ == '__main__':
-    # Initialize Elasticsearch index and sample data
+    # es_setup connects on import, so only the server process loads it
+    from app.utils.es_setup import create_index, index_sample_data
+
+    # Both are no-ops once the index exists and the sample data is current
     create_index()
     index_sample_data()
     
     # Run the Flask app
-    app.run(debug=True) 
\ No newline at end of file
+    app.run(debug=True) 
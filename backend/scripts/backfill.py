@@ -0,0 +1,48 @@
+"""Run a registered document transform over its index
+
+Run from the backend directory:
+
+    python -m scripts.backfill --list
+    python -m scripts.backfill normalize_resource_fields --dry-run
+    python -m scripts.backfill normalize_resource_fields --slices 8 --workers 4
+    python -m scripts.backfill normalize_resource_fields --resume
+
+Transforms are registered with @transform in app/utils/resource_transforms.py.
+Bump a transform's version to run it again over an index it has completed.
+"""
+import argparse
+import sys
+from app.utils import resource_transforms  # noqa: F401 - registers the transforms
+from app.utils.backfill import TRANSFORMS, run_migration
+from app.utils.index_migration import MigrationError
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('name', nargs='?', help='Transform to run')
+    parser.add_argument('--list', action='store_true', help='List the registered transforms')
+    parser.add_argument('--slices', type=int, default=4, help='Sliced scrolls over the index')
+    parser.add_argument('--workers', type=int, help='Worker processes, defaults to one per slice up to 8')
+    parser.add_argument('--batch-size', type=int, default=500, help='Documents per scroll page and _bulk request')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing')
+    parser.add_argument('--resume', action='store_true', help='Skip slices a previous run completed')
+    args = parser.parse_args()
+
+    if args.list or not args.name:
+        for migration in TRANSFORMS.values():
+            print(f"{migration.name} v{migration.version} on {migration.index}: {migration.description}")
+        return
+
+    try:
+        results = run_migration(args.name, slices=args.slices, workers=args.workers, dry_run=args.dry_run,
+                                resume=args.resume, batch_size=args.batch_size)
+    except MigrationError as e:
+        print(f"✗ Migration failed: {str(e)}")
+        sys.exit(1)
+    if any(stats['failed'] for stats in results):
+        print("✗ Some documents were not written, rerun with --resume")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
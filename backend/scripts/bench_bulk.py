@@ -0,0 +1,96 @@
+"""Compare bulk ingestion throughput: per-item index + refresh vs Resource.bulk_create
+
+Run from the backend directory against a local Elasticsearch:
+
+    python -m scripts.bench_bulk --count 5000 --chunk-size 500
+"""
+import argparse
+import time
+from app.models.resource import Resource
+from app.utils.es_client import get_es
+from app.utils.index_migration import resolve_alias
+
+BENCH_INDEX = 'ai_resources_bench'
+
+
+class BenchResource(Resource):
+    index_name = BENCH_INDEX
+
+
+def make_resources(count):
+    """Synthetic resources shaped like real submissions"""
+    return [
+        {
+            "title": f"Benchmark Resource {i}",
+            "url": f"https://example.com/bench/{i}",
+            "description": "Synthetic resource used to measure bulk ingestion throughput. " * 4,
+            "category": "Tutorial",
+            "resource_type": "Tutorial",
+            "tags": ["benchmark", "bulk", f"tag-{i % 50}"],
+            "author": "Benchmark",
+            "difficulty_level": "Intermediate",
+            "status": "approved"
+        }
+        for i in range(count)
+    ]
+
+
+def drop_index(es):
+    """Delete the versioned index behind the bench alias; ES refuses deletes through an alias"""
+    index = resolve_alias(es, BENCH_INDEX)
+    if index:
+        es.indices.delete(index=index)
+
+
+def reset_index(es):
+    drop_index(es)
+    BenchResource.setup_index()
+
+
+def bench_per_item(es, resources):
+    """The previous path: one index call and one refresh per resource"""
+    reset_index(es)
+    start = time.perf_counter()
+    for resource_data in resources:
+        resource, body = BenchResource.build(resource_data)
+        es.index(index=BENCH_INDEX, body=body)
+        es.indices.refresh(index=BENCH_INDEX)
+    return time.perf_counter() - start
+
+
+def bench_bulk(es, resources, chunk_size, thread_count):
+    """Streaming bulk with a single refresh at the end"""
+    reset_index(es)
+    start = time.perf_counter()
+    result = BenchResource.bulk_create(resources, chunk_size=chunk_size, thread_count=thread_count)
+    elapsed = time.perf_counter() - start
+    if result['failed']:
+        print(f"✗ {len(result['failed'])} items failed")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=2000)
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--skip-per-item', action='store_true', help='Only run the bulk path')
+    args = parser.parse_args()
+
+    es = get_es()
+    resources = make_resources(args.count)
+
+    rows = []
+    if not args.skip_per_item:
+        rows.append(('per-item index + refresh', bench_per_item(es, resources)))
+    rows.append((f'bulk_create chunk={args.chunk_size} threads={args.threads}',
+                 bench_bulk(es, resources, args.chunk_size, args.threads)))
+    drop_index(es)
+
+    print(f"\n{args.count} resources")
+    for name, elapsed in rows:
+        print(f"  {name:<40} {elapsed:8.2f}s  {args.count / elapsed:10.0f} docs/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Compare type-filtered searches fanned out to every shard vs routed by resource type
+
+Loads a multi-shard bench index with type-routed resources, then runs the
+same type-filtered searches with and without routing and reports the shards
+each one touched and its latency. Run from the backend directory against a
+local Elasticsearch:
+
+    python -m scripts.bench_routing --shards 6 --count 20000 --runs 50
+"""
+import argparse
+import statistics
+import time
+from elasticsearch.helpers import streaming_bulk
+from app.models.resource import Resource
+from app.utils.es_client import get_es
+from app.utils.query_compiler import SearchQuery
+from app.utils.routing import new_resource_id, type_routing
+
+BENCH_INDEX = 'ai_resources_routing_bench'
+
+
+def make_actions(count):
+    """Synthetic approved resources spread over every type, routed by type"""
+    for i in range(count):
+        resource_type = Resource.RESOURCE_TYPES[i % len(Resource.RESOURCE_TYPES)]
+        resource, body = Resource.build({
+            "title": f"Routing Benchmark {i}",
+            "url": f"https://example.com/routing/{i}",
+            "description": "Synthetic resource used to measure routed searches. " * 4,
+            "category": "Tutorial",
+            "resource_type": resource_type,
+            "tags": ["benchmark", f"tag-{i % 50}"],
+            "difficulty_level": "Intermediate",
+            "status": "approved"
+        })
+        yield {
+            '_index': BENCH_INDEX,
+            '_id': new_resource_id(resource_type),
+            'routing': type_routing(resource_type),
+            '_source': body
+        }
+
+
+def load(es, count, shards):
+    if es.indices.exists(index=BENCH_INDEX):
+        es.indices.delete(index=BENCH_INDEX)
+    body = Resource.index_body()
+    body['settings'] = {**body['settings'], 'number_of_shards': shards, 'number_of_replicas': 0}
+    es.indices.create(index=BENCH_INDEX, body=body)
+    for ok, item in streaming_bulk(es, make_actions(count), chunk_size=1000, raise_on_error=False):
+        if not ok:
+            print(f"✗ {item}")
+    es.indices.refresh(index=BENCH_INDEX)
+
+
+def bench(es, resource_type, text, routed, runs):
+    """(shards touched, total hits, p50 ms, p95 ms) for one search shape"""
+    search_query = SearchQuery(text=text, resource_type=resource_type, match='exact')
+    params = {'routing': type_routing(resource_type)} if routed else {}
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = es.search(index=BENCH_INDEX, body=search_query.full_body(),
+                           request_cache=False, **params)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    return result['_shards']['total'], result['hits']['total']['value'], statistics.median(latencies), p95
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=20000)
+    parser.add_argument('--shards', type=int, default=6)
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--query', default='benchmark', help="Text query, '' for filter-only searches")
+    parser.add_argument('--keep', action='store_true', help='Keep the bench index afterwards')
+    args = parser.parse_args()
+
+    es = get_es()
+    load(es, args.count, args.shards)
+
+    print(f"\n{args.count} resources, {args.shards} shards, {args.runs} runs per search")
+    print(f"  {'resource_type':<20} {'mode':<8} {'shards':>6} {'hits':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for resource_type in Resource.RESOURCE_TYPES:
+        for routed in (False, True):
+            shards, hits, p50, p95 = bench(es, resource_type, args.query, routed, args.runs)
+            mode = 'routed' if routed else 'fan-out'
+            print(f"  {resource_type:<20} {mode:<8} {shards:>6} {hits:>7} {p50:8.2f} {p95:8.2f}")
+
+    if not args.keep:
+        es.indices.delete(index=BENCH_INDEX)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,13 @@
+"""Scrape trending AI repositories from GitHub into ai_resources
+
+Run from the backend directory: python -m scripts.gen_git
+"""
 import requests
 from bs4 import BeautifulSoup
 from datetime import datetime
-from elasticsearch import Elasticsearch, exceptions
-import json
-
-ES_HOST = 'http://127.0.0.1:9200'  # Update if necessary
-INDEX_NAME = 'ai_resources'
-
-# Initialize Elasticsearch client
-es = Elasticsearch(ES_HOST)
+from elasticsearch import exceptions
+from app.utils.resource_transforms import parse_star_count
+from app.utils.seeding import seed_resources, print_seed_summary
 
 def scrape_github_repos():
     """Scrape trending AI-related GitHub repositories"""
@@ -39,27 +38,25 @@ def scrape_github_repos():
             "resource_type": "GitHub Repository",
             "tags": topics if topics else ["GitHub", "AI", "Python"],
             "author": "GitHub Community",
-            "publication_date": datetime.now().isoformat(),
+            "publication_date": datetime.utcnow().isoformat(),
             "difficulty_level": "Intermediate",
             "prerequisites": ["Python", "Deep Learning"],
             "submitted_by": "scraper@learn.ai",
-            "stars": stars,
+            "github_stars": parse_star_count(stars),
             "status": "approved",
-            "created_at": datetime.now().isoformat()
+            "created_at": datetime.utcnow().isoformat()
         })
 
     return repos
 
 def push_to_elasticsearch(repos):
-    """Push the scraped data into Elasticsearch"""
-    for repo in repos:
-        try:
-            es.index(index='ai_resources', body=repo)
-            print(f"✅ Pushed '{repo['title']}' to Elasticsearch.")
-        except exceptions.ConnectionError as e:
-            print(f"❌ Error connecting to Elasticsearch: {str(e)}")
-        except exceptions.RequestError as e:
-            print(f"❌ Request error while pushing data: {str(e)}")
+    """Push the scraped data into Elasticsearch; repositories already indexed are left alone"""
+    try:
+        print_seed_summary('github_trending', seed_resources('github_trending', repos))
+    except exceptions.ConnectionError as e:
+        print(f"❌ Error connecting to Elasticsearch: {str(e)}")
+    except exceptions.RequestError as e:
+        print(f"❌ Request error while pushing data: {str(e)}")
 
 if __name__ == "__main__":
 
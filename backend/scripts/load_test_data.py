@@ -1,7 +1,11 @@
-import json
-from datetime import datetime
-from app.models.user import User
-from app.models.resource import Resource
+"""Load the admin user and the test resources
+
+Safe to rerun: the admin is only created when missing, and the resources
+are seeded with URL-derived ids behind a version marker.
+
+    python -m scripts.load_test_data
+"""
+from app.utils.seeding import seed_resources, seed_user, print_seed_summary
 
 def load_test_data():
     # Create admin user
@@ -9,13 +13,14 @@ def load_test_data():
         "email": "admin@learn.ai",
         "password": "Admin123!",
         "name": "Admin User",
-        "role": "admin",
-        "created_at": datetime.utcnow().isoformat()
+        "role": "admin"
     }
 
     try:
-        User.create(admin_data)
-        print("✓ Admin user created successfully")
+        if seed_user(admin_data):
+            print("✓ Admin user created successfully")
+        else:
+            print("✓ Admin user already exists")
     except Exception as e:
         print(f"✗ Failed to create admin user: {str(e)}")
 
@@ -68,18 +73,9 @@ def load_test_data():
         ]
     }
 
-    # Ensure indices exist
-    Resource.setup_index()
-
     # Load resources
-    results = Resource.bulk_create(test_resources['resources'])
-    
-    print("\nResource Creation Results:")
-    print(f"✓ Successfully created: {len(results['success'])} resources")
-    if results['failed']:
-        print(f"✗ Failed to create: {len(results['failed'])} resources")
-        for failed in results['failed']:
-            print(f"  - {failed['data']['title']}: {failed['error']}")
+    summary = seed_resources('test_resources', test_resources['resources'])
+    print_seed_summary('test_resources', summary)
 
 if __name__ == '__main__':
-    load_test_data() 
\ No newline at end of file
+    load_test_data()
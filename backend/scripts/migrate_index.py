@@ -0,0 +1,124 @@
+"""Move the ai_resources alias onto a new versioned index with the current mapping
+
+Run from the backend directory:
+
+    python -m scripts.migrate_index            # migrate to Resource.MAPPING_VERSION
+    python -m scripts.migrate_index --delete-old
+    python -m scripts.migrate_index --version 3 --route-by-type
+
+--route-by-type moves every resource onto a '<type slug>~<id>' id routed by
+its type and rewrites user bookmarks to the new ids. Set
+RESOURCE_ROUTING=resource_type once it has run.
+"""
+import argparse
+import sys
+from elasticsearch.helpers import scan
+from app.models.resource import Resource
+from app.models.user import User
+from app.utils.es_client import get_es
+from app.utils.index_migration import migrate_index, resolve_alias, MigrationError
+from app.utils.routing import ROUTING_SEPARATOR, type_routing
+
+# Documents indexed before typeahead have no suggest input
+FILL_SUGGEST_SCRIPT = """
+if (ctx._source.suggest == null) {
+  List inputs = new ArrayList();
+  if (ctx._source.title != null) { inputs.add(ctx._source.title); }
+  if (ctx._source.tags != null) { inputs.addAll(ctx._source.tags); }
+  ctx._source.suggest = ['input': inputs];
+}
+"""
+
+# Prefix unrouted ids with their type slug and route on it
+ROUTE_BY_TYPE_SCRIPT = FILL_SUGGEST_SCRIPT + """
+if (ctx._id.indexOf(params.separator) < 0) {
+  String slug = params.slugs.get(ctx._source.resource_type);
+  ctx._id = (slug == null ? params.fallback : slug) + params.separator + ctx._id;
+}
+ctx._routing = ctx._id.substring(0, ctx._id.indexOf(params.separator));
+"""
+
+# Point bookmarks at the routed ids
+REMAP_BOOKMARKS_SCRIPT = """
+if (ctx._source.bookmarks == null) { ctx.op = 'noop'; return; }
+boolean changed = false;
+for (int i = 0; i < ctx._source.bookmarks.size(); i++) {
+  String renamed = params.ids.get(ctx._source.bookmarks[i]);
+  if (renamed != null) { ctx._source.bookmarks[i] = renamed; changed = true; }
+}
+if (!changed) { ctx.op = 'noop'; }
+"""
+
+FALLBACK_SLUG = 'other'
+
+
+def routing_plan(es, index):
+    """Type slugs and the old -> new id map for the unrouted resources in index"""
+    slugs = {}
+    ids = {}
+    for hit in scan(es, index=index, query={'_source': ['resource_type']}):
+        if ROUTING_SEPARATOR in hit['_id']:
+            continue
+        resource_type = hit['_source'].get('resource_type')
+        slug = type_routing(resource_type) if resource_type else ''
+        if resource_type and slug:
+            slugs[resource_type] = slug
+        ids[hit['_id']] = f"{slug or FALLBACK_SLUG}{ROUTING_SEPARATOR}{hit['_id']}"
+    return slugs, ids
+
+
+def remap_bookmarks(es, ids):
+    """Rewrite user bookmarks that refer to renamed resources"""
+    if not ids or not es.indices.exists(index=User.index_name):
+        return
+    result = es.update_by_query(
+        index=User.index_name,
+        body={'script': {'source': REMAP_BOOKMARKS_SCRIPT, 'lang': 'painless', 'params': {'ids': ids}}},
+        conflicts='proceed',
+        refresh=True,
+        request_timeout=3600
+    )
+    print(f"✓ Remapped bookmarks on {result.get('updated', 0)} users")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--version', type=int, default=Resource.MAPPING_VERSION)
+    parser.add_argument('--slices', default='auto', help="Reindex slices, 'auto' or a number")
+    parser.add_argument('--delete-old', action='store_true', help='Delete the previous index after the swap')
+    parser.add_argument('--route-by-type', action='store_true', help='Move resources onto type-routed ids')
+    args = parser.parse_args()
+
+    es = get_es()
+    slices = args.slices if args.slices == 'auto' else int(args.slices)
+    script = FILL_SUGGEST_SCRIPT
+    params = None
+    ids = {}
+    try:
+        if args.route_by_type:
+            source = resolve_alias(es, Resource.index_name)
+            if source is None:
+                raise MigrationError(f"Nothing to migrate: {Resource.index_name} does not exist")
+            slugs, ids = routing_plan(es, source)
+            script = ROUTE_BY_TYPE_SCRIPT
+            params = {'slugs': slugs, 'fallback': FALLBACK_SLUG, 'separator': ROUTING_SEPARATOR}
+
+        result = migrate_index(
+            es,
+            Resource.index_name,
+            Resource.versioned_index(args.version),
+            Resource.index_body(),
+            script=script,
+            slices=slices,
+            keep_old=not args.delete_old,
+            params=params
+        )
+        if result['migrated']:
+            remap_bookmarks(es, ids)
+    except MigrationError as e:
+        print(f"✗ Migration failed: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Move existing users onto ids derived from their normalized email
+
+Run from the backend directory, in a quiet window:
+
+    python -m scripts.migrate_user_ids --dry-run
+    python -m scripts.migrate_user_ids
+
+Each user stored under a random id is copied to user_id_for_email(email)
+with op_type=create and the old document is deleted. Emails are stored
+normalized. Several documents with one email are merged into the oldest,
+keeping the union of their bookmarks. A user who already registered
+under the new id keeps that document and gains the old bookmarks.
+
+Tokens carry the user id, so users sign in again after the migration.
+Rerunning is safe: migrated users are skipped.
+"""
+import argparse
+import sys
+from collections import defaultdict
+from elasticsearch.helpers import scan, bulk
+from app.models.user import User, normalize_email, user_id_for_email
+from app.utils.es_client import get_es
+
+# Merge bookmarks into a user created under the new id after the deploy
+MERGE_BOOKMARKS_SCRIPT = """
+if (ctx._source.bookmarks == null) { ctx._source.bookmarks = new ArrayList(); }
+for (String id : params.bookmarks) {
+  if (!ctx._source.bookmarks.contains(id)) { ctx._source.bookmarks.add(id); }
+}
+"""
+
+
+def migration_plan(es):
+    """New id -> documents to fold into it, for every user not yet under its email id"""
+    plan = defaultdict(list)
+    skipped = []
+    for hit in scan(es, index=User.index_name, query={'query': {'match_all': {}}}):
+        email = hit['_source'].get('email')
+        if not email:
+            skipped.append(hit['_id'])
+            continue
+        new_id = user_id_for_email(email)
+        if hit['_id'] != new_id:
+            plan[new_id].append(hit)
+    return plan, skipped
+
+
+def merged_source(hits):
+    """The oldest document with the email normalized and every bookmark of the others"""
+    hits = sorted(hits, key=lambda hit: hit['_source'].get('created_at') or '')
+    source = dict(hits[0]['_source'])
+    source['email'] = normalize_email(source['email'])
+    bookmarks = list(source.get('bookmarks') or [])
+    for hit in hits[1:]:
+        for resource_id in hit['_source'].get('bookmarks') or []:
+            if resource_id not in bookmarks:
+                bookmarks.append(resource_id)
+    source['bookmarks'] = bookmarks
+    return source
+
+
+def migrate(es, plan):
+    """Create the email-keyed users, then delete the documents they replace"""
+    actions = [
+        {'_op_type': 'create', '_index': User.index_name, '_id': new_id, '_source': merged_source(hits)}
+        for new_id, hits in plan.items()
+    ]
+    created, errors = bulk(es, actions, raise_on_error=False)
+
+    existing = {}
+    failed = []
+    for error in errors:
+        info = error['create']
+        if info.get('status') == 409:
+            existing[info['_id']] = merged_source(plan[info['_id']])['bookmarks']
+        else:
+            failed.append(info['_id'])
+
+    merged = 0
+    if existing:
+        merged, merge_errors = bulk(es, [
+            {
+                '_op_type': 'update', '_index': User.index_name, '_id': new_id,
+                'script': {'source': MERGE_BOOKMARKS_SCRIPT, 'lang': 'painless', 'params': {'bookmarks': bookmarks}}
+            }
+            for new_id, bookmarks in existing.items()
+        ], raise_on_error=False)
+        failed.extend(next(iter(error.values()))['_id'] for error in merge_errors)
+
+    # Only drop old documents whose replacement was written
+    deleted, _ = bulk(es, [
+        {'_op_type': 'delete', '_index': User.index_name, '_id': hit['_id']}
+        for new_id, hits in plan.items() if new_id not in failed
+        for hit in hits
+    ], raise_on_error=False)
+    es.indices.refresh(index=User.index_name)
+    return {'created': created, 'merged': merged, 'deleted': deleted, 'failed': failed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dry-run', action='store_true', help='Report what would move without writing')
+    args = parser.parse_args()
+
+    es = get_es()
+    if not es.indices.exists(index=User.index_name):
+        print(f"✓ {User.index_name} does not exist, nothing to migrate")
+        return
+
+    plan, skipped = migration_plan(es)
+    documents = sum(len(hits) for hits in plan.values())
+    duplicates = {new_id: hits for new_id, hits in plan.items() if len(hits) > 1}
+    print(f"→ {documents} user documents to move onto {len(plan)} email ids")
+    for hits in duplicates.values():
+        print(f"  {normalize_email(hits[0]['_source']['email'])}: merging {len(hits)} documents")
+    for user_id in skipped:
+        print(f"  ✗ {user_id} has no email, left in place")
+    if args.dry_run or not plan:
+        return
+
+    result = migrate(es, plan)
+    print(f"✓ {result['created']} created, {result['merged']} merged into existing users, "
+          f"{result['deleted']} old documents deleted")
+    if result['failed']:
+        print(f"✗ {len(result['failed'])} users failed and were left in place: {', '.join(result['failed'])}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
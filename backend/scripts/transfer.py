@@ -0,0 +1,56 @@
+"""Export indices to NDJSON and import them back, e.g. to move between clusters or take backups
+
+Run from the backend directory:
+
+    python -m scripts.transfer export ai_resources backups/resources.ndjson.gz
+    python -m scripts.transfer import ai_resources backups/resources.ndjson.gz --threads 4
+    python -m scripts.transfer export ai_users backups/users.ndjson --resume
+
+Files ending in .gz are gzipped. Both directions checkpoint to
+<file>.checkpoint; --resume continues from it after a crash. Point
+ELASTICSEARCH_HOSTS at the source cluster to export and the target to import.
+"""
+import argparse
+import sys
+from app.models.resource import Resource
+from app.models.user import User
+from app.utils.es_client import get_es
+from app.utils.transfer import export_index, import_index, TransferError
+
+# Known indices are created with their mapping before an import
+SETUP = {
+    Resource.index_name: Resource.setup_index,
+    User.index_name: User.setup_index
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('direction', choices=['export', 'import'])
+    parser.add_argument('index', help=f"Index or alias, e.g. {', '.join(SETUP)}")
+    parser.add_argument('path', help='NDJSON file, gzipped when it ends in .gz')
+    parser.add_argument('--resume', action='store_true', help='Continue from the last checkpoint')
+    parser.add_argument('--page-size', type=int, default=1000, help='Export: documents per page')
+    parser.add_argument('--threads', type=int, default=4, help='Import: parallel_bulk threads')
+    parser.add_argument('--chunk-size', type=int, default=500, help='Import: documents per _bulk request')
+    args = parser.parse_args()
+
+    es = get_es()
+    try:
+        if args.direction == 'export':
+            export_index(es, args.index, args.path, page_size=args.page_size, resume=args.resume)
+        else:
+            if args.index in SETUP:
+                SETUP[args.index]()
+            result = import_index(es, args.index, args.path, thread_count=args.threads,
+                                  chunk_size=args.chunk_size, resume=args.resume)
+            if result['failed']:
+                print(f"✗ {len(result['failed'])} documents failed, first: {result['failed'][0]}")
+                sys.exit(1)
+    except TransferError as e:
+        print(f"✗ Transfer failed: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+import jwt
+import pytest
+from elasticsearch.exceptions import NotFoundError
+import app.models.user as user_module
+from app.models.user import User, UserValidationError, TokenUser, JWT_SECRET
+from app.utils.cache import ResultCache
+
+USER_ID = 'u1'
+USER = {
+    'email': 'ada@example.com',
+    'name': 'ada',
+    'role': 'admin',
+    'bookmarks': ['r1', 'r2'],
+    'created_at': '2024-01-15T10:00:00',
+    'password_hash': 'hash',
+    'auth_version': 2
+}
+
+
+class StubES:
+    """Serves user documents by id and counts the reads"""
+
+    def __init__(self, users):
+        self.users = users
+        self.gets = 0
+
+    def get(self, index=None, id=None, **params):
+        self.gets += 1
+        if id not in self.users:
+            raise NotFoundError(404, 'not_found', {})
+        return {'_id': id, '_source': self.users[id]}
+
+
+@pytest.fixture
+def es(monkeypatch):
+    stub = StubES({USER_ID: dict(USER)})
+    monkeypatch.setattr(user_module, 'es', stub)
+    return stub
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    fresh = ResultCache(ttl=60)
+    monkeypatch.setattr(user_module, 'user_cache', fresh)
+    return fresh
+
+
+def token(**claims):
+    return jwt.encode({'user_id': USER_ID, **claims}, JWT_SECRET)
+
+
+def current_token():
+    return token(**User.token_claims(USER_ID, USER))
+
+
+def test_token_is_verified_from_its_claims(es, cache):
+    user = User.verify_token(current_token())
+
+    assert isinstance(user, TokenUser)
+    assert (user['id'], user['role'], user.claims['ver']) == (USER_ID, 'admin', 2)
+    assert user
+    assert es.gets == 0
+
+
+def test_other_fields_load_the_user_once(es, cache):
+    user = User.verify_token(current_token())
+
+    assert user['email'] == USER['email']
+    assert user['bookmarks'] == USER['bookmarks']
+    assert es.gets == 1
+    # The read filled the cache, so the next token needs no read either
+    assert User.verify_token(current_token())['name'] == 'ada'
+    assert es.gets == 1
+
+
+def test_missing_user_fails_on_first_use(es, cache):
+    user = User.verify_token(jwt.encode({'user_id': 'gone', 'role': 'user', 'ver': 0}, JWT_SECRET))
+    with pytest.raises(UserValidationError, match='User not found'):
+        user['email']
+
+
+def test_cached_auth_version_revokes_older_tokens(es, cache):
+    old_token = current_token()
+    es.users[USER_ID]['auth_version'] = 3
+    User.get(USER_ID)
+
+    with pytest.raises(UserValidationError, match='revoked'):
+        User.verify_token(old_token)
+    assert User.verify_token(token(role='admin', ver=3))['role'] == 'admin'
+
+
+def test_revocation_without_cached_user_waits_for_the_cache(es, cache):
+    old_token = current_token()
+    es.users[USER_ID]['auth_version'] = 3
+
+    # Not cached in this process, so the claims are trusted
+    assert User.verify_token(old_token).claims['ver'] == 2
+    cache.set(USER_ID, {'id': USER_ID, **es.users[USER_ID]})
+    with pytest.raises(UserValidationError, match='revoked'):
+        User.verify_token(old_token)
+
+
+def test_legacy_token_reads_role_and_version_from_the_user(es, cache):
+    user = User.verify_token(token())
+
+    assert es.gets == 1
+    assert (user['role'], user.claims['ver']) == ('admin', 2)
+    assert user['email'] == USER['email']
+    assert es.gets == 1
+
+
+def test_legacy_token_for_missing_user_is_rejected(es, cache):
+    with pytest.raises(UserValidationError, match='User not found'):
+        User.verify_token(jwt.encode({'user_id': 'gone'}, JWT_SECRET))
+
+
+def test_legacy_token_uses_the_cached_user(es, cache):
+    User.get(USER_ID)
+    assert User.verify_token(token())['role'] == 'admin'
+    assert es.gets == 1
+
+
+def test_bad_tokens_raise_jwt_errors(es, cache):
+    with pytest.raises(jwt.InvalidTokenError):
+        User.verify_token(jwt.encode({'user_id': USER_ID}, 'wrong-secret'))
+    with pytest.raises(UserValidationError, match='Invalid token'):
+        User.get_from_token('not-a-token')
+
+
+def test_cached_user_is_copied_on_read(es, cache):
+    User.get(USER_ID)
+
+    user = User.verify_token(current_token())
+    user['bookmarks'].append('r3')
+    assert cache.get(USER_ID)['bookmarks'] == ['r1', 'r2']
+
+    User.get_cached(USER_ID)['bookmarks'].clear()
+    assert cache.get(USER_ID)['bookmarks'] == ['r1', 'r2']
+
+
+def test_get_caches_a_copy(es, cache):
+    data = User.get(USER_ID)
+    data['bookmarks'].append('r3')
+    assert cache.get(USER_ID)['bookmarks'] == ['r1', 'r2']
@@ -0,0 +1,27 @@
+import pytest
+from app.models.user import bookmark_cursor, bookmark_position
+
+
+def test_cursor_follows_its_anchor():
+    ids = ['e', 'd', 'c', 'b', 'a']
+    cursor = bookmark_cursor(ids, 2)
+    assert bookmark_position(ids, cursor) == 3
+    # A bookmark added in front shifts the list but not the page
+    assert bookmark_position(['f'] + ids, cursor) == 4
+
+
+def test_removed_anchor_resumes_with_the_next_bookmark():
+    cursor = bookmark_cursor(['e', 'd', 'c', 'b', 'a'], 2)
+    ids = ['e', 'd', 'b', 'a']
+    assert ids[bookmark_position(ids, cursor)] == 'b'
+
+
+def test_removed_anchor_past_the_end():
+    cursor = bookmark_cursor(['c', 'b', 'a'], 2)
+    assert bookmark_position(['c', 'b'], cursor) == 2
+
+
+@pytest.mark.parametrize('cursor', ['not a cursor', 'e30=', bookmark_cursor(['a'], 0)[:-4]])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        bookmark_position(['a'], cursor)
@@ -0,0 +1,153 @@
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from elasticsearch.exceptions import ConnectionError
+from app.utils.es_client import create_client
+
+ROOT = {
+    'name': 'stand-in',
+    'cluster_name': 'test',
+    'version': {'number': '7.17.0', 'build_flavor': 'default'},
+    'tagline': 'You Know, for Search'
+}
+
+
+class StandIn:
+    """Local HTTP server answering like an Elasticsearch node, or failing with status"""
+
+    def __init__(self, status=200):
+        self.status = status
+        self.hits = []
+        # Address the node publishes when sniffed; defaults to itself
+        self.published = None
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.hits.append(self.path)
+                if self.path.startswith('/_nodes'):
+                    address = stand_in.published or f"127.0.0.1:{stand_in.port}"
+                    body = {'nodes': {'node-1': {'http': {'publish_address': address}}}}
+                else:
+                    body = ROOT
+                payload = json.dumps(body).encode()
+                self.send_response(stand_in.status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('X-Elastic-Product', 'Elasticsearch')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.port = self.server.server_address[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def requests(self):
+        return [path for path in self.hits if not path.startswith('/_nodes')]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def unreachable_url():
+    """A local port nothing listens on"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+@pytest.fixture
+def stand_ins():
+    servers = []
+
+    def start(status=200):
+        server = StandIn(status)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    def apply(hosts, **env):
+        monkeypatch.setenv('ELASTICSEARCH_HOSTS', ','.join(hosts))
+        monkeypatch.setenv('ELASTICSEARCH_TIMEOUT', '2')
+        for name, value in env.items():
+            monkeypatch.setenv(name, str(value))
+    return apply
+
+
+def test_client_builds_while_every_seed_is_down(settings):
+    settings([unreachable_url(), unreachable_url()])
+    es = create_client()
+    assert es.transport.sniff_on_connection_fail
+
+    with pytest.raises(ConnectionError):
+        es.info()
+    # A sniff with no node up keeps the seeds and waits for the next interval
+    es.transport.get_connection()
+    assert len(es.transport.connection_pool.connections) == 2
+    assert es.transport.last_sniff > time.time() - 5
+
+
+def test_first_request_sniffs_the_cluster(settings, stand_ins):
+    seed, data_node = stand_ins(), stand_ins()
+    seed.published = f"127.0.0.1:{data_node.port}"
+    settings([unreachable_url(), seed.url])
+    es = create_client()
+    assert seed.hits == []
+
+    es.info()
+    assert '/_nodes/_all/http' in seed.hits
+    assert [c.port for c in es.transport.connection_pool.connections] == [data_node.port]
+    assert data_node.requests() == ['/']
+
+
+def test_requests_fail_over_to_a_live_seed(settings, stand_ins):
+    down, up = stand_ins(status=503), stand_ins()
+    settings([down.url, up.url], ELASTICSEARCH_SNIFF='false', ELASTICSEARCH_DEAD_TIMEOUT=60)
+    es = create_client()
+
+    pool = es.transport.connection_pool
+    while not pool.dead.queue:
+        es.info()
+    failed_requests = len(down.requests())
+
+    for _ in range(10):
+        es.info()
+    # The failed node is skipped while it is backed off
+    assert len(down.requests()) == failed_requests
+    assert [c.port for c in pool.connections] == [up.port]
+    assert [c.port for _, c in pool.dead.queue] == [down.port]
+
+
+def test_failed_node_backs_off_doubling(settings, stand_ins):
+    down, up = stand_ins(status=503), stand_ins()
+    settings([down.url, up.url], ELASTICSEARCH_SNIFF='false', ELASTICSEARCH_DEAD_TIMEOUT=0.2)
+    es = create_client()
+    pool = es.transport.connection_pool
+    down_connection = next(c for c in pool.connections if c.port == down.port)
+
+    timeouts = []
+    while len(timeouts) < 3:
+        es.info()
+        if pool.dead_count.get(down_connection, 0) > len(timeouts):
+            dead_until, _ = pool.dead.queue[0]
+            timeouts.append(dead_until - time.time())
+        time.sleep(0.02)
+
+    # 0.2s, 0.4s, 0.8s
+    assert 0.1 < timeouts[0] <= 0.2
+    assert 0.3 < timeouts[1] <= 0.4
+    assert 0.7 < timeouts[2] <= 0.8
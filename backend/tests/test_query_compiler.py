@@ -0,0 +1,223 @@
+import json
+import re
+import pytest
+from elasticsearch.exceptions import NotFoundError
+from flask import Flask
+import app.models.resource as resource_module
+import app.services.search_service as search_service_module
+from app.models.resource import Resource
+from app.routes.resources import resources_bp
+from app.services.search_service import SearchService
+from app.utils.cache import search_cache
+from app.utils.query_compiler import SearchQuery, TEMPLATE_ID, TEMPLATE_SOURCE
+
+
+class StubES:
+    """Records the search requests it is sent and answers them with an empty page"""
+
+    def __init__(self):
+        self.requests = []
+
+    def search(self, index=None, body=None, **params):
+        self.requests.append(('search', body))
+        return self.response()
+
+    def search_template(self, index=None, body=None, **params):
+        self.requests.append(('search_template', body))
+        return self.response()
+
+    @staticmethod
+    def response():
+        # Enough hits that adaptive matching never falls back to fuzzy
+        return {'hits': {'total': {'value': 10, 'relation': 'eq'}, 'hits': []}}
+
+
+MUSTACHE_TAG = re.compile(r'{{([#^/]?)(\w+)}}')
+
+
+def render_template(source, params):
+    """The mustache the stored template uses: {{name}}, sections, inverted sections and toJson"""
+    out = []
+    pos = 0
+    while True:
+        tag = MUSTACHE_TAG.search(source, pos)
+        if tag is None:
+            out.append(source[pos:])
+            return ''.join(out)
+        out.append(source[pos:tag.start()])
+        kind, name = tag.groups()
+        if not kind:
+            out.append(json.dumps(params[name]))
+            pos = tag.end()
+            continue
+        depth = 1
+        close = tag
+        while depth:
+            close = MUSTACHE_TAG.search(source, close.end())
+            if close.group(2) == name and close.group(1):
+                depth += -1 if close.group(1) == '/' else 1
+        inner = source[tag.end():close.start()]
+        if name == 'toJson':
+            out.append(json.dumps(params[inner]))
+        elif (kind == '#') == bool(params.get(name)):
+            out.append(render_template(inner, params))
+        pos = close.end()
+
+
+@pytest.fixture
+def es(monkeypatch):
+    stub = StubES()
+    monkeypatch.setattr(resource_module, 'es', stub)
+    monkeypatch.setattr(Resource, 'es', stub)
+    monkeypatch.setattr(search_service_module, 'get_es', lambda: stub)
+    # Every entry point must reach Elasticsearch, not the result cache
+    monkeypatch.setattr(search_cache, 'get', lambda key: None)
+    return stub
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(resources_bp)
+    return app.test_client()
+
+
+QUERY = 'neural networks'
+CATEGORY = 'Tutorial'
+TAGS = ['pytorch', 'deep-learning']
+PAGE = 2
+SIZE = 10
+ARGS = {'query': QUERY, 'category': CATEGORY, 'tags': ','.join(TAGS), 'page': PAGE, 'size': SIZE}
+
+
+def entry_point_requests(es, client):
+    """The request each entry point sends for the same search"""
+    sent = []
+
+    Resource.search(query=QUERY, category=CATEGORY, tags=TAGS, page=PAGE, size=SIZE)
+    sent.append(es.requests.pop())
+
+    assert client.get('/api/resources', query_string=ARGS).status_code == 200
+    sent.append(es.requests.pop())
+
+    assert client.get('/api/allresources', query_string=ARGS).status_code == 200
+    sent.append(es.requests.pop())
+
+    SearchService().search(QUERY, category=CATEGORY, tags=TAGS, page=PAGE, size=SIZE)
+    sent.append(es.requests.pop())
+    return sent
+
+
+def test_inline_bodies_identical_across_entry_points(es, client, monkeypatch):
+    monkeypatch.setattr(SearchQuery, 'templates_registered', False)
+    sent = entry_point_requests(es, client)
+
+    expected = SearchQuery(text=QUERY, category=CATEGORY, tags=TAGS, page=PAGE, size=SIZE).to_body()
+    assert sent == [('search', expected)] * 4
+
+
+def test_template_params_identical_across_entry_points(es, client, monkeypatch):
+    monkeypatch.setattr(SearchQuery, 'templates_registered', True)
+    sent = entry_point_requests(es, client)
+
+    expected = SearchQuery(text=QUERY, category=CATEGORY, tags=TAGS, page=PAGE, size=SIZE).params()
+    assert sent == [('search_template', {'id': TEMPLATE_ID, 'params': expected})] * 4
+
+
+def test_filters_are_not_scored():
+    body = SearchQuery(text=QUERY, category=CATEGORY, tags=TAGS).to_body()
+    assert body['query']['bool']['must'] == [
+        {'multi_match': {'query': QUERY, 'fields': ['title^3', 'description^2', 'tags', 'author'],
+                         'type': 'best_fields'}}
+    ]
+    assert body['query']['bool']['filter'] == [
+        {'term': {'status': 'approved'}},
+        {'term': {'category.keyword': CATEGORY}},
+        {'terms': {'tags.keyword': sorted(TAGS)}}
+    ]
+
+
+TEMPLATE_QUERIES = [
+    SearchQuery(),
+    SearchQuery(text=QUERY, category=CATEGORY, tags=TAGS, page=PAGE, size=SIZE),
+    SearchQuery(resource_type='Course', difficulty_level='Beginner', sort_by='github_stars', sort_order='asc'),
+    SearchQuery(text=QUERY, match='fuzzy', total_policy='exact', status=None),
+    SearchQuery(status=None, tags=TAGS, difficulty_level='Advanced'),
+    SearchQuery(status=None, difficulty_level='Advanced'),
+    SearchQuery(text='quote " and \\ backslash', category='C++ & "Rust"')
+]
+
+
+@pytest.mark.parametrize('search_query', TEMPLATE_QUERIES)
+def test_template_renders_to_body(search_query):
+    assert json.loads(render_template(TEMPLATE_SOURCE, search_query.params())) == search_query.to_body()
+
+
+@pytest.mark.parametrize('search_query', TEMPLATE_QUERIES)
+def test_template_params_are_scalars(search_query):
+    for name, value in search_query.params().items():
+        if name == 'tags':
+            assert value is None or all(isinstance(tag, str) for tag in value)
+        else:
+            assert value is None or isinstance(value, (str, int, bool)), name
+
+
+def test_template_request_is_smaller_than_the_body():
+    search_query = SearchQuery(text='neural nets', category='Tutorial', tags=['a', 'b'])
+    template_request = {'id': TEMPLATE_ID, 'params': search_query.params()}
+    assert len(json.dumps(template_request)) < len(json.dumps(search_query.to_body()))
+
+
+class ScriptStore:
+    def __init__(self, source=None):
+        self.source = source
+        self.puts = 0
+
+    def get_script(self, id):
+        if self.source is None:
+            raise NotFoundError(404, 'resource_not_found_exception', {})
+        return {'_id': id, 'found': True, 'script': {'lang': 'mustache', 'source': self.source}}
+
+    def put_script(self, id, body):
+        self.puts += 1
+        self.source = body['script']['source']
+
+
+@pytest.mark.parametrize('stored, puts', [(None, 1), ('{"query":{}}', 1), (TEMPLATE_SOURCE, 0)])
+def test_register_templates_only_writes_when_changed(monkeypatch, stored, puts):
+    monkeypatch.setattr(SearchQuery, 'templates_registered', False)
+    store = ScriptStore(stored)
+    assert SearchQuery.register_templates(store)
+    assert store.puts == puts
+    assert store.source == TEMPLATE_SOURCE
+
+
+def test_listing_without_cursor_pages_through_the_cache(client, monkeypatch):
+    stub = StubES()
+    stub.open_point_in_time = lambda **kwargs: pytest.fail('opened a point-in-time without a cursor')
+    monkeypatch.setattr(resource_module, 'es', stub)
+    monkeypatch.setattr(Resource, 'es', stub)
+    search_cache.bump_generation()
+
+    for _ in range(3):
+        response = client.get('/api/resources', query_string={'category': 'Tutorial'})
+        assert response.status_code == 200
+        assert response.get_json()['next_cursor'] is None
+    assert len(stub.requests) == 1
+
+
+def test_empty_cursor_starts_cursor_mode():
+    assert SearchQuery.from_args({'cursor': ''}).cursor_mode
+    assert not SearchQuery.from_args({}).cursor_mode
+
+
+@pytest.mark.parametrize('fields, source', [
+    (None, {'excludes': ['description']}),
+    ('title,description', {'includes': ['title'], 'excludes': ['description']}),
+    ('-url', {'excludes': ['description', 'url']}),
+    ('description', False)
+])
+def test_highlight_leaves_description_out_of_source(fields, source):
+    body = SearchQuery(text=QUERY, fields=fields, highlight=True).full_body()
+    assert body['_source'] == source
+    assert 'description' in body['highlight']['fields']
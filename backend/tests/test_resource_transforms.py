@@ -0,0 +1,40 @@
+import pytest
+from app.models.resource import Resource
+from app.utils.resource_transforms import normalize_date, normalize_resource_fields
+
+
+@pytest.mark.parametrize('value', [
+    '2024-01-15T10:00:00Z',
+    '2024-01-15T10:00:00.123456',
+    '2024-01-15T10:00:00+02:00',
+    '2024-01-15'
+])
+def test_iso_dates_are_left_alone(value):
+    assert normalize_date(value) == value
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('2024/01/15', '2024-01-15T00:00:00Z'),
+    ('15/01/2024', '2024-01-15T00:00:00Z'),
+    ('Jan 15, 2024', '2024-01-15T00:00:00Z'),
+    ('2024-01-15 10:00:00', '2024-01-15T10:00:00Z'),
+    (' 2024-01-15T12:00:00+02:00 ', '2024-01-15T10:00:00Z'),
+    (1705312800, '2024-01-15T10:00:00Z'),
+    (1705312800123, '2024-01-15T10:00:00.123Z'),
+    ('yesterday', None),
+    (True, None)
+])
+def test_other_dates_become_iso_utc(value, expected):
+    assert normalize_date(value) == expected
+
+
+def test_documents_written_by_the_model_are_unchanged():
+    _, body = Resource.build({
+        'title': 'Attention Is All You Need',
+        'url': 'https://arxiv.org/abs/1706.03762',
+        'description': 'The transformer paper',
+        'category': 'Research Paper',
+        'resource_type': 'Research Paper',
+        'publication_date': '2017-06-12'
+    })
+    assert normalize_resource_fields(dict(body)) == body
@@ -0,0 +1,57 @@
+import pytest
+from flask import Flask
+import app.models.resource as resource_module
+from app.routes.search import search_bp
+from app.utils.cache import search_cache
+
+
+class StubES:
+    """Answers each _msearch body with one empty page per query"""
+
+    def __init__(self):
+        self.batches = []
+
+    def msearch(self, body=None, **params):
+        self.batches.append(body)
+        return {'responses': [{'hits': {'total': {'value': 0, 'relation': 'eq'}, 'hits': []}}
+                              for _ in body[::2]]}
+
+
+@pytest.fixture
+def es(monkeypatch):
+    stub = StubES()
+    monkeypatch.setattr(resource_module, 'es', stub)
+    monkeypatch.setattr(resource_module.Resource, 'es', stub)
+    monkeypatch.setattr(search_cache, 'get', lambda key: None)
+    return stub
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(search_bp)
+    return app.test_client()
+
+
+@pytest.mark.parametrize('bad_spec', [
+    {'name': 'a', 'size': {}},
+    {'name': 'a', 'page': [1]},
+    {'name': 'a', 'tags': 5},
+    {'name': 'a', 'sort_order': 'sideways'}
+])
+def test_bad_spec_is_reported_by_name(es, client, bad_spec):
+    response = client.post('/api/search/batch', json=[bad_spec, {'name': 'b'}])
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['errors']['a']['error'] == 'Invalid parameters'
+    assert list(body['results']) == ['b']
+    # Only the valid query is sent
+    assert len(es.batches) == 1 and len(es.batches[0]) == 2
+
+
+@pytest.mark.parametrize('spec', [{'size': 3}, {'name': 5}, {'name': ''}, 'a'])
+def test_spec_without_string_name_is_rejected(es, client, spec):
+    response = client.post('/api/search/batch', json=[spec])
+    assert response.status_code == 400
+    assert es.batches == []
@@ -37,7 +37,7 @@ const Bookmarks = () => {
       console.log('Bookmarks response:', data); // Log the response
 
       if (response.ok) {
-        setBookmarks(data || []);
+        setBookmarks(data.bookmarks || []);
       } else if (response.status === 401) {
         handleAuthError();
       } else {
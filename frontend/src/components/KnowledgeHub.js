@@ -108,11 +108,11 @@ const KnowledgeHub = () => {
     
     try {
       const headers = getAuthHeaders();
-      const response = await fetch('http://127.0.0.1:5000/api/bookmarks', { headers });
+      const response = await fetch('http://127.0.0.1:5000/api/bookmarks/ids', { headers });
       const data = await response.json();
       
       if (response.ok) {
-        setBookmarks(new Set(data.bookmarks.map(b => b.id)));
+        setBookmarks(new Set(data.ids));
       } else if (response.status === 401) {
         handleAuthError();
       }